@@ -1,7 +1,7 @@
 import streamlit as st
 from PIL import Image
-import pandas as pd
-import numpy as np
+
+from safesip.warmup import start_background_warm_up
 
 # Set page configuration
 st.set_page_config(
@@ -11,6 +11,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource # Runs once per server process
+def warm_up_model():
+    # Load the model in the background so the first analysis does not pay for it
+    return start_background_warm_up()
+
+warm_up_model()
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
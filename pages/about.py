@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from safesip import ARTIFACT_PATH, EXPECTED_FEATURE_ORDER, MODEL_PATH, SCALER_PATH
+from safesip.charts import figure_to_png
+from safesip.registry import get_registry
 
 
 # Set page configuration
@@ -13,6 +13,56 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Used when no model could be loaded
+ILLUSTRATIVE_IMPORTANCE = [14.18, 11.48, 11.05, 11.66, 14.53, 9.33, 9.06, 9.58, 9.1]
+
+
+@st.cache_data(max_entries=1, show_spinner=False) # Rendered once per model version
+def load_importance_chart(_predictor, version):
+    importance = None if _predictor is None else _predictor.feature_importances_
+    illustrative = importance is None
+    if illustrative:
+        importance = ILLUSTRATIVE_IMPORTANCE
+    else:
+        importance = [value * 100 for value in importance]
+
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    parameters = [key if key != 'ph' else 'pH' for key in EXPECTED_FEATURE_ORDER]
+    fig, ax = plt.subplots(figsize=(16.5, 7.5))
+    y_pos = np.arange(len(parameters))
+    ax.barh(y_pos, importance, color='#1E88E5')
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(parameters)
+    ax.invert_yaxis()
+    ax.set_xlabel('Relative Importance (%)')
+    title = 'Water Quality Parameter Importance in Potability Prediction'
+    ax.set_title(f"{title} (Illustrative)" if illustrative else title)
+
+    for i, v in enumerate(importance):
+        ax.text(v + 0.2, i, f"{v:.2f}%", va='center')
+
+    plt.tight_layout()
+    return figure_to_png(fig)
+
+
+@st.cache_data(show_spinner=False) # The illustrative matrix never changes
+def load_confusion_matrix_chart():
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import seaborn as sns
+
+    conf_matrix = np.array([[223, 29], [82, 69]])
+
+    fig, ax = plt.subplots(figsize=(6, 5))
+    sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', cbar=False, ax=ax,
+                xticklabels=['Predicted Potable', 'Predicted Non-Potable'],
+                yticklabels=['Actually Potable', 'Actually Non-Potable'])
+    ax.set_title('Model Prediction Accuracy (Illustrative)')
+    plt.tight_layout()
+    return figure_to_png(fig)
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -219,26 +269,12 @@ st.markdown('<p class="sub-header">Parameter Importance</p>', unsafe_allow_html=
 st.markdown('<p class="content-text">Not all water quality parameters have equal importance in determining potability. Our model, like many tree-based models, can estimate the relative importance of each parameter:</p>', unsafe_allow_html=True) # Slight rephrase for generality
 
 
-feature_importance = {
-    'Parameter': ['pH', 'Hardness', 'Solids', 'Chloramines', 'Sulfate', 
-                  'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity'],
-    'Importance': [14.18, 11.48, 11.05, 11.66, 14.53, 9.33, 9.06, 9.58, 9.1]
-}
-
-fig, ax = plt.subplots(figsize=(16.5, 7.5))
-y_pos = np.arange(len(feature_importance['Parameter']))
-ax.barh(y_pos, feature_importance['Importance'], color='#1E88E5')
-ax.set_yticks(y_pos)
-ax.set_yticklabels(feature_importance['Parameter'])
-ax.invert_yaxis()
-ax.set_xlabel('Relative Importance (%)')
-ax.set_title('Water Quality Parameter Importance in Potability Prediction (Illustrative)')
-
-for i, v in enumerate(feature_importance['Importance']):
-    ax.text(v + 0.2, i, f"{v}%", va='center')
-
-plt.tight_layout()
-st.pyplot(fig)
+# Read from the model the Analyze page already has in memory rather than unpickling another copy
+active_model = get_registry(MODEL_PATH, SCALER_PATH, ARTIFACT_PATH, engine="compiled").ensure_loaded()
+if active_model is not None:
+    st.image(load_importance_chart(active_model.predictor, active_model.version), use_container_width=True)
+else:
+    st.image(load_importance_chart(None, None), use_container_width=True)
 st.markdown('<hr>', unsafe_allow_html=True)
 
 st.markdown('<p class="sub-header">Model Accuracy</p>', unsafe_allow_html=True)
@@ -257,15 +293,7 @@ with col1:
     """, unsafe_allow_html=True)
 
 with col2:
-    conf_matrix = np.array([[223, 29], [82, 69]])
-    
-    fig, ax = plt.subplots(figsize=(6, 5))
-    sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', cbar=False,
-                xticklabels=['Predicted Potable', 'Predicted Non-Potable'],
-                yticklabels=['Actually Potable', 'Actually Non-Potable'])
-    plt.title('Model Prediction Accuracy (Illustrative)')
-    plt.tight_layout()
-    st.pyplot(fig)
+    st.image(load_confusion_matrix_chart(), use_container_width=True)
 
 st.markdown('<hr>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Limitations and Considerations</p>', unsafe_allow_html=True)
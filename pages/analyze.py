@@ -1,9 +1,20 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import joblib
 import os
 
+from safesip import EXPECTED_FEATURE_ORDER, MODEL_PATH, SCALER_PATH, Predictor, load_model, load_scaler
+from safesip.predictor import ARTIFACT_PATH, CASCADE_PATH
+from safesip import PredictionCache
+from safesip import PARAM_INFO as param_info
+from safesip.batching import BatchingPredictor
+from safesip.charts import figure_to_png
+from safesip.cascade import CascadePredictor, load_student
+from safesip.counterfactual import find_counterfactuals
+from safesip.score import score_frame
+from safesip.sweep import decision_surface, sensitivity_curve
+from safesip.registry import get_registry
+
 # Set page configuration
 st.set_page_config(
     page_title="SafeSip - Inputs",
@@ -12,15 +23,26 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-MODEL_PATH = "random_forest_model.joblib"
-SCALER_PATH = "random_forest_scaler.joblib" 
+@st.cache_resource # One registry per server process; it hot-reloads the model when its files change
+def load_registry():
+    registry = get_registry(MODEL_PATH, SCALER_PATH, ARTIFACT_PATH, engine="compiled")
+    registry.start_watching()
+    return registry
+
+@st.cache_resource(max_entries=1) # Only used when the registry has no model; reports what is wrong with the files
+def load_predictor(model_path, scaler_path, version):
+    # The flat-array artifact is memory-mapped and shared by every server process on the host
+    if os.path.isdir(ARTIFACT_PATH):
+        try:
+            return Predictor.from_artifact(ARTIFACT_PATH)
+        except Exception as e:
+            st.error(f"An unexpected error occurred while loading the model artifact '{ARTIFACT_PATH}': {e}")
+            st.warning("Falling back to the joblib model and scaler files.")
 
-@st.cache_resource # Cache the model to load it only once
-def load_model_and_scaler(model_path, scaler_path):
     model = None
     scaler = None
     try:
-        model = joblib.load(model_path)
+        model = load_model(model_path)
     except FileNotFoundError:
         st.error(f"FileNotFoundError: Model file not found at '{model_path}'.")
         st.error(f"Current directory: '{os.getcwd()}'. Please ensure the file exists or path is correct.")
@@ -32,18 +54,74 @@ def load_model_and_scaler(model_path, scaler_path):
         st.error(f"An unexpected error occurred while loading the model: {e}")
 
     try:
-        scaler = joblib.load(scaler_path)
+        scaler = load_scaler(scaler_path)
     except FileNotFoundError:
         st.error(f"FileNotFoundError: Scaler file not found at '{scaler_path}'.")
         st.error(f"Current directory: '{os.getcwd()}'. Please ensure the file exists or path is correct.")
         st.warning("If your model was trained on scaled data, predictions will be incorrect without the scaler.")
     except Exception as e:
         st.error(f"An unexpected error occurred while loading the scaler: {e}")
-    
-    return model, scaler
+
+    if model is None or scaler is None:
+        return None
+    return Predictor(model, scaler, engine="compiled")
+
+@st.cache_resource(max_entries=1) # One prediction cache shared by every session
+def load_prediction_cache(_predictor, version):
+    # Cache misses from concurrent sessions are scored together in one forest pass
+    return PredictionCache(BatchingPredictor(_predictor))
+
+@st.cache_resource(max_entries=1) # The distilled screening model for cascade scoring, if one has been fitted
+def load_cascade_student(version):
+    try:
+        return load_student(CASCADE_PATH)
+    except Exception as e:
+        st.error(f"An unexpected error occurred while loading the cascade model '{CASCADE_PATH}': {e}")
+        return None
+
+@st.cache_data(max_entries=512, show_spinner=False) # Curves are keyed by (parameter, other values)
+def load_sensitivity_curve(_predictor, version, param, other_values):
+    sample = dict(other_values)
+    sample[param] = param_info[param]['default']
+    grid, potable_probability = sensitivity_curve(_predictor, sample, param)
+    return pd.DataFrame({param: grid, "Potable probability": potable_probability})
+
+@st.cache_data(max_entries=64, show_spinner=False) # Grids are keyed by the quantized remaining features
+def load_decision_surface(_predictor, version, x_param, y_param, other_units):
+    sample = {key: units * param_info[key]['step'] for key, units in other_units}
+    sample[x_param] = param_info[x_param]['default']
+    sample[y_param] = param_info[y_param]['default']
+    return decision_surface(_predictor, sample, x_param, y_param)
+
+@st.cache_data(max_entries=64, show_spinner=False) # Rendered once per grid and sample position, not on every rerun
+def load_decision_surface_chart(_predictor, version, x_param, y_param, other_units, sample_point):
+    import matplotlib.pyplot as plt
+    x_grid, y_grid, surface = load_decision_surface(_predictor, version, x_param, y_param, other_units)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    image = ax.pcolormesh(x_grid, y_grid, surface, cmap='RdYlGn', vmin=0.0, vmax=1.0, shading='nearest')
+    ax.scatter([sample_point[0]], [sample_point[1]], color='#0D47A1', edgecolors='white', s=120, zorder=3, label='This sample')
+    ax.set_xlabel(x_param.replace('_', ' ').title())
+    ax.set_ylabel(y_param.replace('_', ' ').title())
+    ax.legend(loc='upper right')
+    fig.colorbar(image, ax=ax, label='Potable probability')
+    plt.tight_layout()
+    return figure_to_png(fig)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_counterfactuals(_predictor, version, sample_items):
+    return find_counterfactuals(_predictor, dict(sample_items), target=1, n_results=3, time_budget=1.0)
 
 # Load the model and scaler when the script runs
-model, scaler = load_model_and_scaler(MODEL_PATH, SCALER_PATH)
+# The registry swaps in a new model/scaler pair atomically; this run keeps the version it read here
+registry = load_registry()
+active_model = registry.ensure_loaded()
+if active_model is not None:
+    model_version = active_model.version
+    predictor = active_model.predictor
+else:
+    model_version = registry.fingerprint()
+    predictor = load_predictor(MODEL_PATH, SCALER_PATH, model_version)
+prediction_cache = load_prediction_cache(predictor, model_version) if predictor is not None else None
 
 # Custom CSS for styling (Your CSS remains the same)
 st.markdown("""
@@ -266,30 +344,10 @@ with st.sidebar:
 if 'step' not in st.session_state:
     st.session_state.step = 1
 
-# Make sure the order of features is exactly as your model input
-EXPECTED_FEATURE_ORDER = [
-    'ph', 'Hardness', 'Solids', 'Chloramines', 'Sulfate', 
-    'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity'
-]
-
-
 if 'water_params' not in st.session_state:
     st.session_state.water_params = {param: None for param in EXPECTED_FEATURE_ORDER}
 
 
-# Parameter ranges and descriptions
-param_info = {
-    'ph': {'min': 1.0, 'max': 14.0, 'desc': 'Measures how acidic/basic the water is. Ideal range is 6.5-8.5.', 'step': 0.1, 'default': 7.0},
-    'Hardness': {'min': 30.0, 'max': 300.0, 'desc': 'Amount of dissolved calcium and magnesium in mg/L. Ideal range is 60-180 mg/L (moderately hard to hard).', 'step': 1.0, 'default': 150.0},
-    'Solids': {'min': 100.0, 'max': 60000.0, 'desc': 'Total dissolved solids (TDS) in ppm.', 'step': 100.0, 'default': 2000.0},
-    'Chloramines': {'min': 0.1, 'max': 13.0, 'desc': 'Disinfectants used in water treatment in mg/L. Ideal range is 0.5-4 mg/L.', 'step': 0.1, 'default': 7.0},
-    'Sulfate': {'min': 100.0, 'max': 500.0, 'desc': 'Naturally occurring mineral in mg/L. Ideal range is less than 250 mg/L (with a maximum of 500 mg/L for aesthetic reasons).', 'step': 1.0, 'default': 300.0},
-    'Conductivity': {'min': 100.0, 'max': 800.0, 'desc': 'Ability of water to conduct electricity in μS/cm. Ideal range is 50-500 μS/cm.', 'step': 1.0, 'default': 400.0},
-    'Organic_carbon': {'min': 2.0, 'max': 30.0, 'desc': 'Amount of carbon bound in organic compounds in mg/L. Ideal range is less than 2 mg/L for treated water and less than 4 mg/L for source water.', 'step': 0.1, 'default': 15.0},
-    'Trihalomethanes': {'min': 0.5, 'max': 150.0, 'desc': 'Byproducts of water disinfection in μg/L. Ideal range is less than 80 μg/L (US EPA MCL) or less than 100 μg/L (EU directive).', 'step': 0.5, 'default': 60.0},
-    'Turbidity': {'min': 1.0, 'max': 7.0, 'desc': 'Cloudiness of water caused by suspended particles in NTU. Ideal range is 1.0-5.0 NTU.', 'step': 0.1, 'default': 4.0}
-}
-
 for param_key in EXPECTED_FEATURE_ORDER:
     if st.session_state.water_params.get(param_key) is None:
         st.session_state.water_params[param_key] = param_info[param_key]['default']
@@ -303,10 +361,124 @@ def prev_step():
 def go_to_results():
     st.session_state.step = len(EXPECTED_FEATURE_ORDER) + 1 
 
+def open_full_analysis():
+    # Show the quick-entry sample on the wizard's results page, with the explanation and decision surface
+    st.session_state.input_mode = "Single sample"
+    go_to_results()
+
+def show_prediction(prediction):
+    probability = prediction.probabilities
+    if prediction.label == 1:
+        st.markdown('<div class="result-potable">💧 The water is predicted to be POTABLE.</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="confidence">Model Confidence: {probability[1]*100:.2f}% ± {prediction.margin[1]*100:.2f}% Potable</div>', unsafe_allow_html=True)
+        st.markdown(f'<p class="parameter-desc">{prediction.tree_votes[1]} of {prediction.n_trees} trees in the forest vote potable.</p>', unsafe_allow_html=True)
+    elif prediction.label == 0:
+        st.markdown('<div class="result-not-potable">⚠️ The water is predicted to be NON-POTABLE.</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="confidence">Model Confidence: {probability[0]*100:.2f}% ± {prediction.margin[0]*100:.2f}% Non-Potable</div>', unsafe_allow_html=True)
+        st.markdown(f'<p class="parameter-desc">{prediction.tree_votes[0]} of {prediction.n_trees} trees in the forest vote non-potable.</p>', unsafe_allow_html=True)
+    else:
+        st.info(f"Model returned an unexpected prediction value: {prediction.label}")
+
 # Main header
 st.markdown('<p class="main-header">Water Quality Analysis</p>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Input Your Water Quality Parameters</p>', unsafe_allow_html=True)
 
+input_mode = st.radio("Input mode", ["Single sample", "Quick entry", "Bulk upload"], horizontal=True, key="input_mode")
+
+# Quick entry: all nine parameters in one form, so an analysis costs one rerun and one inference on submit
+if input_mode == "Quick entry":
+    with st.form("quick_entry_form"):
+        quick_columns = st.columns(3)
+        for i, key in enumerate(EXPECTED_FEATURE_ORDER):
+            with quick_columns[i % 3]:
+                st.number_input(
+                    key.replace("_", " ").title(),
+                    min_value=float(param_info[key]['min']),
+                    max_value=float(param_info[key]['max']),
+                    value=float(st.session_state.water_params[key]),
+                    step=float(param_info[key]['step']),
+                    help=param_info[key]['desc'],
+                    key=f"quick_{key}"
+                )
+        submitted = st.form_submit_button("Analyze", type="primary", use_container_width=True)
+
+    if submitted:
+        for key in EXPECTED_FEATURE_ORDER:
+            st.session_state.water_params[key] = st.session_state[f"quick_{key}"]
+        if predictor is None:
+            st.error("Model or scaler could not be loaded. Cannot perform analysis.")
+        else:
+            try:
+                show_prediction(prediction_cache.predict_one(st.session_state.water_params))
+            except Exception as e:
+                st.error(f"An unexpected error occurred during prediction: {e}")
+                st.stop()
+            st.button("Full analysis", on_click=open_full_analysis, key="quick_full_analysis_button", type="secondary",
+                      help="Explanation, suggested adjustments and decision surface for this sample")
+    st.stop()
+
+# Bulk upload: score every row of a CSV/Excel file in one pass
+if input_mode == "Bulk upload":
+    st.markdown(f'<p class="parameter-desc">Upload a CSV or Excel file with the columns: {", ".join(EXPECTED_FEATURE_ORDER)}.</p>', unsafe_allow_html=True)
+    uploaded_file = st.file_uploader("Upload water samples", type=["csv", "xlsx", "xls"], key="bulk_upload")
+
+    if uploaded_file is not None:
+        try:
+            if uploaded_file.name.lower().endswith(".csv"):
+                batch_df = pd.read_csv(uploaded_file)
+            else:
+                batch_df = pd.read_excel(uploaded_file)
+        except Exception as e:
+            st.error(f"Could not read the uploaded file: {e}")
+            st.stop()
+
+        missing_columns = [col for col in EXPECTED_FEATURE_ORDER if col not in batch_df.columns]
+        if missing_columns:
+            st.error(f"The uploaded file is missing the columns: {', '.join(missing_columns)}")
+        elif predictor is None:
+            st.error("Model or scaler could not be loaded. Cannot perform analysis.")
+        else:
+            batch_predictor = predictor
+            student = load_cascade_student(model_version)
+            if student is not None:
+                agreement = f"{student.agreement:.1%}" if student.agreement is not None else "unmeasured"
+                if st.checkbox("Fast screening", value=True, key="bulk_cascade",
+                               help=f"A small distilled model answers clear-cut rows and the full forest scores the rest. Agreement with the forest on held-out samples: {agreement}."):
+                    batch_predictor = CascadePredictor(predictor, student)
+            try:
+                # One validation pass, one transform and one predict_proba call for the whole batch
+                results_df, validation = score_frame(batch_predictor, batch_df)
+            except Exception as e:
+                st.error(f"An unexpected error occurred during batch prediction: {e}")
+                st.stop()
+            if batch_predictor is not predictor:
+                cascade_stats = batch_predictor.stats()
+                st.info(f"Fast screening: {cascade_stats['fallbacks']} of {cascade_stats['rows']} row(s) ({cascade_stats['fallback_rate']:.1%}) needed the full forest.")
+            scored = int(results_df["Potable_Probability"].notna().sum())
+            if "Imputed" in results_df and results_df["Imputed"].any():
+                st.info(f"{int(results_df['Imputed'].sum())} row(s) had missing values filled in by the imputer before scoring; see the Imputed column.")
+            if scored < len(results_df):
+                issues = "; ".join(
+                    f"{feature}: " + ", ".join(f"{n} {name}" for name, n in counts.items())
+                    for feature, counts in validation.counts().items()
+                )
+                st.warning(f"{len(results_df) - scored} row(s) have missing, non-numeric or out-of-range values and were not scored ({issues}).")
+                results_df["Issues"] = [", ".join(validation.messages(i)) for i in range(len(results_df))]
+            for feature in validation.suspect_columns():
+                st.warning(f"Most {feature} values are outside {param_info[feature]['min']}-{param_info[feature]['max']}. Check that the column uses the expected units.")
+
+            potable = int((results_df["Prediction"] == 1).sum())
+            st.markdown(f'<div class="confidence">Scored {scored} of {len(results_df)} samples: {potable} potable, {scored - potable} non-potable.</div>', unsafe_allow_html=True)
+            st.dataframe(results_df, use_container_width=True, hide_index=True)
+            st.download_button(
+                "Download scored file",
+                data=results_df.to_csv(index=False).encode("utf-8"),
+                file_name="safesip_scored.csv",
+                mime="text/csv",
+                key="bulk_download_button"
+            )
+    st.stop()
+
 # Progress bar
 total_steps = len(EXPECTED_FEATURE_ORDER) 
 current_step_display = min(st.session_state.step, total_steps) 
@@ -359,6 +531,12 @@ if st.session_state.step <= total_steps:
             on_change=number_input_change_callback
         )
     
+    if predictor is not None:
+        other_values = tuple((key, float(st.session_state.water_params[key])) for key in EXPECTED_FEATURE_ORDER if key != current_param_key)
+        curve_df = load_sensitivity_curve(predictor, model_version, current_param_key, other_values)
+        st.markdown(f'<p class="parameter-desc">Predicted potability across the {current_param_key.replace("_", " ").title()} range, with the other parameters at their current values:</p>', unsafe_allow_html=True)
+        st.line_chart(curve_df, x=current_param_key, y="Potable probability", height=250)
+
     col1, col2 = st.columns([1, 1.2])
     with col1:
         if st.session_state.step > 1:
@@ -395,34 +573,38 @@ elif st.session_state.step == total_steps + 1:
     
     if not all_params_filled:
         st.error("Cannot perform analysis because some parameters are missing. Please use the 'Start Over' button.")
-    elif model is None:
-        st.error("Model could not be loaded. Cannot perform analysis.")
-    elif scaler is None: 
-        st.error("Scaler could not be loaded. Cannot perform analysis if model was trained on scaled data.")
-        st.warning("If your model does NOT require scaled data, you can remove the scaler loading and usage.")
+    elif predictor is None:
+        st.error("Model or scaler could not be loaded. Cannot perform analysis.")
     else:
         try:
             input_df = pd.DataFrame([data_for_model_dict], columns=EXPECTED_FEATURE_ORDER)
-            input_scaled = scaler.transform(input_df)
-            prediction = model.predict(input_scaled) 
-            
-            try:
-                probability = model.predict_proba(input_scaled)
-            except AttributeError:
-                probability = None
-
-            result_value = prediction[0] 
-            
-            if result_value == 1:
-                st.markdown('<div class="result-potable">💧 The water is predicted to be POTABLE.</div>', unsafe_allow_html=True)
-                if probability is not None:
-                    st.markdown(f'<div class="confidence">Model Confidence: {probability[0][1]*100:.2f}% Potable</div>', unsafe_allow_html=True)
-            elif result_value == 0:
-                st.markdown('<div class="result-not-potable">⚠️ The water is predicted to be NON-POTABLE.</div>', unsafe_allow_html=True)
-                if probability is not None:
-                    st.markdown(f'<div class="confidence">Model Confidence: {probability[0][0]*100:.2f}% Non-Potable</div>', unsafe_allow_html=True)
-            else:
-                st.info(f"Model returned an unexpected prediction value: {result_value}")
+            prediction = prediction_cache.predict_one(data_for_model_dict)
+            show_prediction(prediction)
+
+            if prediction.label == 0:
+                st.markdown('<p class="parameter-label">Smallest adjustments predicted to make this water potable</p>', unsafe_allow_html=True)
+                with st.spinner("Searching for nearby potable alternatives..."):
+                    counterfactuals = load_counterfactuals(predictor, model_version, tuple(data_for_model_dict.items()))
+                if counterfactuals:
+                    st.dataframe(pd.DataFrame([
+                        {
+                            "Option": i + 1,
+                            "Adjustments": ", ".join(f"{key.replace('_', ' ').title()}: {old:g} → {new:g}" for key, (old, new) in cf.changes.items()),
+                            "Potable Probability": f"{cf.probability*100:.1f}%",
+                        }
+                        for i, cf in enumerate(counterfactuals)
+                    ]), use_container_width=True, hide_index=True)
+                else:
+                    st.info("No potable alternative was found within the parameter ranges and the search time budget.")
+
+            bias, contributions = predictor.contributions(data_for_model_dict)
+            contribution_df = pd.DataFrame({
+                "Parameter": [key.replace("_", " ").title() for key in EXPECTED_FEATURE_ORDER],
+                "Contribution to potability (%)": contributions[0, :, 1] * 100,
+            })
+            st.markdown('<p class="parameter-label">What drove this result</p>', unsafe_allow_html=True)
+            st.markdown(f'<p class="parameter-desc">Starting from the model\'s average potability of {bias[0, 1]*100:.1f}%, each parameter of this sample pushed the prediction up or down by:</p>', unsafe_allow_html=True)
+            st.bar_chart(contribution_df, x="Parameter", y="Contribution to potability (%)", height=300)
 
         except ValueError as ve:
             st.error(f"ValueError during prediction: {ve}")
@@ -433,6 +615,25 @@ elif st.session_state.step == total_steps + 1:
             st.warning("Please ensure all parameters were entered correctly and the model/scaler are compatible with the input.")
             st.code(f"Data sent to scaler: \n{input_df.to_string()}")
             
+    if all_params_filled and predictor is not None:
+        st.markdown("<hr style='height: 2px; border: none; color: #1E88E5; background-color: #1E88E5;'>", unsafe_allow_html=True)
+        st.markdown('<p class="sub-header">Decision Surface</p>', unsafe_allow_html=True)
+        st.markdown('<p class="parameter-desc">How two parameters together drive the predicted potability, with the others held at this sample\'s values.</p>', unsafe_allow_html=True)
+
+        col_x, col_y = st.columns(2)
+        with col_x:
+            x_param = st.selectbox("Horizontal axis", EXPECTED_FEATURE_ORDER, index=EXPECTED_FEATURE_ORDER.index('ph'), key="surface_x_param")
+        with col_y:
+            y_options = [key for key in EXPECTED_FEATURE_ORDER if key != x_param]
+            y_param = st.selectbox("Vertical axis", y_options, index=y_options.index('Sulfate') if 'Sulfate' in y_options else 0, key="surface_y_param")
+
+        other_units = tuple(
+            (key, round(data_for_model_dict[key] / param_info[key]['step']))
+            for key in EXPECTED_FEATURE_ORDER if key not in (x_param, y_param)
+        )
+        sample_point = (data_for_model_dict[x_param], data_for_model_dict[y_param])
+        st.image(load_decision_surface_chart(predictor, model_version, x_param, y_param, other_units, sample_point), use_container_width=True)
+
     if st.button("⬅️ Start Over", key="restart_button", type="secondary", use_container_width=True):
         st.session_state.step = 1
         for param_key_reset in EXPECTED_FEATURE_ORDER:
@@ -0,0 +1,36 @@
+"""Headless SafeSip inference, importable without Streamlit."""
+from safesip.cache import PredictionCache, artifact_version
+from safesip.features import EXPECTED_FEATURE_ORDER, PARAM_INFO
+from safesip.forest import CompiledForest
+from safesip.predictor import (
+    ARTIFACT_PATH,
+    CASCADE_PATH,
+    FUSED_PATH,
+    IMPUTER_PATH,
+    MODEL_PATH,
+    SCALER_PATH,
+    Prediction,
+    Predictor,
+    load_imputer,
+    load_model,
+    load_scaler,
+)
+
+__all__ = [
+    "ARTIFACT_PATH",
+    "CASCADE_PATH",
+    "CompiledForest",
+    "EXPECTED_FEATURE_ORDER",
+    "PARAM_INFO",
+    "FUSED_PATH",
+    "IMPUTER_PATH",
+    "MODEL_PATH",
+    "SCALER_PATH",
+    "Prediction",
+    "PredictionCache",
+    "Predictor",
+    "artifact_version",
+    "load_imputer",
+    "load_model",
+    "load_scaler",
+]
@@ -0,0 +1,188 @@
+"""Flat-array model artifact that server processes can memory-map and share.
+
+The artifact is a directory of ``.npy`` files, one per tree array plus the
+scaler parameters, and a ``meta.json`` written last. Loading it with
+``mmap_mode="r"`` takes milliseconds and leaves a single copy of the forest in
+the OS page cache no matter how many processes use it.
+
+Convert the existing joblib pair with::
+
+    python -m safesip.artifact --model random_forest_model.joblib \
+        --scaler random_forest_scaler.joblib --output random_forest_model.safesip
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.forest import CompiledForest
+from safesip.predictor import (
+    ARTIFACT_PATH,
+    IMPUTER_PATH,
+    MODEL_PATH,
+    SCALER_PATH,
+    imputer_params,
+    load_imputer,
+    load_model,
+    load_scaler,
+    scaler_params,
+)
+
+FORMAT_VERSION = 1
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "values", "roots")
+
+
+class ArrayScaler:
+    """The parts of a fitted StandardScaler that inference needs, as plain arrays."""
+
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ArrayImputer:
+    """The fill values of a fitted SimpleImputer, as a plain array."""
+
+    add_indicator = False
+
+    def __init__(self, statistics):
+        self.statistics_ = statistics
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.where(np.isnan(X), self.statistics_, X)
+
+
+def save_artifact(path, forest, mean=None, scale=None, feature_order=EXPECTED_FEATURE_ORDER, fill=None,
+                  importances=None):
+    """Write ``forest`` and the scaler parameters to the directory ``path``.
+
+    Pass ``mean``/``scale`` for a forest that expects scaled inputs; a forest
+    from :meth:`CompiledForest.fold_scaler` takes raw inputs and needs neither.
+    ``fill`` holds the imputer's per-feature fill values, if there is one, and
+    ``importances`` the model's ``feature_importances_`` for display.
+    """
+    if forest.raw_input != (mean is None):
+        raise ValueError("Pass scaler parameters exactly when the forest expects scaled inputs.")
+    os.makedirs(path, exist_ok=True)
+    for name in FOREST_ARRAYS:
+        _replace_array(path, name, np.ascontiguousarray(getattr(forest, name)))
+    if mean is not None:
+        _replace_array(path, "scaler_mean", np.asarray(mean, dtype=np.float64))
+        _replace_array(path, "scaler_scale", np.asarray(scale, dtype=np.float64))
+    if fill is not None:
+        _replace_array(path, "imputer_fill", np.asarray(fill, dtype=np.float64))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "feature_order": list(feature_order),
+        "classes": np.asarray(forest.classes_).tolist(),
+        "max_depth": forest.max_depth,
+        "raw_input": forest.raw_input,
+        "scaled": mean is not None,
+        "imputed": fill is not None,
+        "feature_importances": None if importances is None else np.asarray(importances, dtype=np.float64).tolist(),
+    }
+    # meta.json goes last, so watchers reload only once every array of the new build is in place
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def _replace_array(path, name, array):
+    # Never write into the old file: processes that have it memory-mapped keep reading the old inode
+    target = os.path.join(path, f"{name}.npy")
+    with open(target + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(target + ".tmp", target)
+
+
+def load_meta(path):
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def feature_importances(path=ARTIFACT_PATH):
+    """The model's feature importances as saved in the artifact, or None if there are none to read."""
+    try:
+        meta = load_meta(path)
+    except (OSError, ValueError):
+        return None
+    # Artifacts written before the importances were stored have no entry
+    return meta.get("feature_importances")
+
+
+def load_artifact(path, mmap_mode="r"):
+    """Return ``(forest, scaler, feature_order, imputer)``.
+
+    ``scaler`` is None for a fused forest and ``imputer`` None if the artifact has none.
+    """
+    meta = load_meta(path)
+    if meta["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {meta['format_version']} in '{path}'.")
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+    forest = CompiledForest(
+        max_depth=meta["max_depth"],
+        classes=np.asarray(meta["classes"]),
+        raw_input=meta["raw_input"],
+        **arrays,
+    )
+    scaler = None
+    if meta["scaled"]:
+        scaler = ArrayScaler(
+            np.load(os.path.join(path, "scaler_mean.npy")),
+            np.load(os.path.join(path, "scaler_scale.npy")),
+        )
+    imputer = None
+    # Artifacts written before imputation existed have no "imputed" entry
+    if meta.get("imputed", False):
+        imputer = ArrayImputer(np.load(os.path.join(path, "imputer_fill.npy")))
+    return forest, scaler, meta["feature_order"], imputer
+
+
+def convert(model_path=MODEL_PATH, scaler_path=SCALER_PATH, output=ARTIFACT_PATH, fused=False, imputer_path=IMPUTER_PATH):
+    """Convert the joblib model/scaler pair (and imputer, if saved) into a flat-array artifact."""
+    model = load_model(model_path)
+    scaler = load_scaler(scaler_path)
+    imputer = load_imputer(imputer_path)
+    feature_order = list(getattr(scaler, "feature_names_in_", EXPECTED_FEATURE_ORDER))
+    if feature_order != EXPECTED_FEATURE_ORDER:
+        raise ValueError(f"Scaler feature order {feature_order} does not match {EXPECTED_FEATURE_ORDER}.")
+
+    forest = CompiledForest.from_model(model)
+    mean, scale = scaler_params(scaler, len(feature_order))
+    fill = imputer_params(imputer, len(feature_order)) if imputer is not None else None
+    importances = getattr(model, "feature_importances_", None)
+    if fused:
+        save_artifact(output, forest.fold_scaler(mean, scale), feature_order=feature_order, fill=fill,
+                      importances=importances)
+    else:
+        save_artifact(output, forest, mean, scale, feature_order=feature_order, fill=fill, importances=importances)
+    return forest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the joblib model/scaler pair into a memory-mappable artifact.")
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--imputer", default=IMPUTER_PATH, help="fitted SimpleImputer (joblib), included if the file exists")
+    parser.add_argument("--output", default=ARTIFACT_PATH, help="artifact directory to write")
+    parser.add_argument("--fused", action="store_true", help="fold the scaler into the thresholds and score raw inputs")
+    args = parser.parse_args(argv)
+
+    forest = convert(args.model, args.scaler, args.output, fused=args.fused, imputer_path=args.imputer)
+    print(f"Wrote {args.output}: {forest.n_trees} trees, {len(forest.threshold)} nodes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Coalesce single-row predictions from concurrent sessions into batched forest passes.
+
+Every Streamlit session runs on its own thread. Scoring one row at a time from
+each of them pays the per-call overhead once per row and has the threads
+contend for the GIL; :class:`BatchingPredictor` instead queues the rows and a
+single worker thread scores whatever has arrived within ``max_wait`` seconds
+as one batch.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from safesip.predictor import Prediction
+
+
+class _Request:
+    __slots__ = ("row", "queued_at", "done", "result", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.queued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchingPredictor:
+    """Drop-in for :meth:`Predictor.predict_one` that batches concurrent calls.
+
+    Results are identical to calling the wrapped predictor directly: every row
+    of a batch is scored independently. The worker thread is started on the
+    first call and exits after ``idle_timeout`` seconds without requests, so
+    replaced predictors do not leave threads behind.
+    """
+
+    def __init__(self, predictor, max_batch_size=64, max_wait=0.002, idle_timeout=30.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        # Callers inside predict_one, and those of them that have not queued their row yet
+        self._in_flight = 0
+        self._arriving = 0
+        self._batch_sizes = Counter()
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+    @property
+    def feature_order(self):
+        return self.predictor.feature_order
+
+    def to_array(self, X):
+        return self.predictor.to_array(X)
+
+    def predict_one(self, sample):
+        with self._lock:
+            # A caller with nobody else in flight is scored inline, without the hand-off to the worker
+            inline = self._in_flight == 0
+            self._in_flight += 1
+            self._arriving += 1
+        try:
+            if inline:
+                with self._lock:
+                    self._arriving -= 1
+                result = self.predictor.predict_one(sample)
+                with self._lock:
+                    self._batch_sizes[1] += 1
+                return result
+            return self._submit(sample)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _submit(self, sample):
+        try:
+            row = self.predictor.to_array(sample)
+            if row.shape[0] != 1:
+                raise ValueError(f"predict_one expects a single sample, got {row.shape[0]}.")
+            request = _Request(row[0])
+            self._queue.put(request)
+        finally:
+            with self._lock:
+                self._arriving -= 1
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="safesip-batching", daemon=True)
+                self._worker.start()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self, first):
+        """Take everything already queued, and wait up to ``max_wait`` only for callers on their way in."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0 or not self._arriving:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # A request queued after the timeout keeps this worker alive
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                labels, probability, votes, spread = self.predictor.predict_with_votes(
+                    np.stack([request.row for request in batch])
+                )
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            else:
+                for i, request in enumerate(batch):
+                    request.result = Prediction(labels[i].item(), probability[i], votes[i], spread[i])
+
+            delays = [started - request.queued_at for request in batch]
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._queue_delay_total += sum(delays)
+                self._queue_delay_max = max(self._queue_delay_max, max(delays))
+            for request in batch:
+                request.done.set()
+
+    def stats(self):
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            rows = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "batches": batches,
+                "rows": rows,
+                "mean_batch_size": rows / batches if batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_delay_ms": 1000 * self._queue_delay_total / rows if rows else 0.0,
+                "max_queue_delay_ms": 1000 * self._queue_delay_max,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._batch_sizes.clear()
+            self._queue_delay_total = 0.0
+            self._queue_delay_max = 0.0
@@ -0,0 +1,105 @@
+"""Process-wide LRU cache of predictions for inputs on the ``PARAM_INFO`` step grid."""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from safesip.features import PARAM_INFO
+
+# How far a value may sit from its grid point and still count as on the grid
+GRID_TOLERANCE = 1e-6
+
+
+def artifact_version(*paths):
+    """Identify the artifact files on disk by their modification time and size."""
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            version.append((path, None, None))
+        else:
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+class PredictionCache:
+    """Bounded LRU cache in front of :meth:`Predictor.predict_one`.
+
+    Samples are keyed by their values quantized to each parameter's ``step``,
+    so every combination the wizard can produce maps to one entry. Values that
+    are not on the grid (API or batch callers with extra precision) bypass the
+    cache rather than being rounded, so cached answers are always exact;
+    so do missing and infinite values. A cache holds one predictor's answers:
+    build a new one when the model changes.
+    """
+
+    def __init__(self, predictor, maxsize=4096, param_info=PARAM_INFO):
+        self.predictor = predictor
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._steps = [param_info[key]["step"] for key in predictor.feature_order]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, sample):
+        """Return the grid key for ``sample``, or None if it is off the grid or not finite."""
+        values = self.predictor.to_array(sample)
+        if values.shape[0] != 1:
+            raise ValueError(f"PredictionCache expects a single sample, got {values.shape[0]}.")
+        key = []
+        for value, step in zip(values[0].tolist(), self._steps):
+            # NaN (imputed by the predictor), inf and values too large to count in steps have no grid point
+            if not math.isfinite(value / step):
+                return None
+            units = round(value / step)
+            if abs(value - units * step) > GRID_TOLERANCE * max(1.0, abs(value)):
+                return None
+            key.append(units)
+        return tuple(key)
+
+    def predict_one(self, sample):
+        key = self.key(sample)
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+            return self.predictor.predict_one(sample)
+
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = self.predictor.predict_one(sample)
+        # Entries are shared across sessions, so hand out read-only arrays
+        for field in result:
+            if isinstance(field, np.ndarray):
+                field.flags.writeable = False
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.bypassed = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,274 @@
+"""Screen samples with a small distilled model and run the forest only on the unclear ones.
+
+Usage::
+
+    python -m safesip.cascade --data water_potability.csv --min-agreement 0.995
+
+The student is a single shallow tree (or a logistic regression) fitted over
+the scaled features to the forest's own predictions, so no labels are needed.
+When its potable probability falls inside ``band`` the row falls back to the
+full forest; outside the band the student's answer is used. The band is the
+narrowest one whose agreement with the forest on held-out samples meets
+``--min-agreement``, and the fit reports that agreement and the fallback rate
+on a further held-out split.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.forest import CompiledForest
+from safesip.predictor import ARTIFACT_PATH, CASCADE_PATH, MODEL_PATH, SCALER_PATH, Predictor, scaler_params
+
+STUDENTS = ("tree", "linear")
+
+
+class Student:
+    """The distilled model, evaluated as array arithmetic on imputed, unscaled rows."""
+
+    def __init__(self, kind, model, mean, scale, band, feature_order=EXPECTED_FEATURE_ORDER, agreement=None,
+                 fallback_rate=None):
+        if kind not in STUDENTS:
+            raise ValueError(f"Unknown student '{kind}'. Expected one of: {', '.join(STUDENTS)}")
+        if len(model.classes_) != 2:
+            raise ValueError("The cascade needs a binary classifier.")
+        self.kind = kind
+        self.model = model
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.band = (float(band[0]), float(band[1]))
+        self.feature_order = list(feature_order)
+        self.agreement = agreement
+        self.fallback_rate = fallback_rate
+        self.classes_ = np.asarray(model.classes_)
+        if kind == "tree":
+            self._forest = CompiledForest.from_model(model)
+        else:
+            self._coef = np.asarray(model.coef_[0], dtype=np.float64)
+            self._intercept = float(model.intercept_[0])
+
+    def proba(self, X):
+        """Probability of ``classes_[1]`` for each row; NaN where a linear student meets a missing value."""
+        Z = (X - self.mean) / self.scale
+        if self.kind == "tree":
+            return self._forest.predict_proba(Z)[:, 1]
+        return 1.0 / (1.0 + np.exp(-(Z @ self._coef + self._intercept)))
+
+    def to_dict(self):
+        return {
+            "kind": self.kind, "model": self.model, "mean": self.mean, "scale": self.scale, "band": self.band,
+            "feature_order": self.feature_order, "agreement": self.agreement, "fallback_rate": self.fallback_rate,
+        }
+
+
+def save_student(student, path=CASCADE_PATH):
+    import joblib
+    joblib.dump(student.to_dict(), path)
+
+
+def load_student(path=CASCADE_PATH):
+    """The student saved by ``python -m safesip.cascade``, or None if there is none."""
+    if path is None or not os.path.exists(path):
+        return None
+    import joblib
+    return Student(**joblib.load(path))
+
+
+class CascadePredictor:
+    """A :class:`~safesip.predictor.Predictor` whose ``predict_proba`` screens rows with a :class:`Student` first.
+
+    Rows the student is confident about get the student's probabilities; the
+    rest are scored by the wrapped predictor in one batch. Everything else
+    (tree votes, contributions, ``predict_one``) is the full forest's.
+    """
+
+    def __init__(self, predictor, student, band=None):
+        if student.feature_order != list(predictor.feature_order):
+            raise ValueError(f"Student feature order {student.feature_order} does not match {predictor.feature_order}.")
+        if not np.array_equal(student.classes_, predictor.classes_):
+            raise ValueError(f"Student classes {student.classes_.tolist()} do not match {predictor.classes_.tolist()}.")
+        self.predictor = predictor
+        self.student = student
+        self.band = student.band if band is None else (float(band[0]), float(band[1]))
+        self.rows = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set in __init__
+        return getattr(self.predictor, name)
+
+    def _student_pass(self, X):
+        """Imputed rows, the student's probabilities and which rows must fall back to the forest."""
+        X = self.predictor._inputs(X)
+        p = self.student.proba(X)
+        low, high = self.band
+        # NaN (a linear student on a missing value) is never confident
+        return X, p, ~((p < low) | (p > high))
+
+    def _count(self, fallback):
+        with self._lock:
+            self.rows += len(fallback)
+            self.fallbacks += int(np.count_nonzero(fallback))
+
+    def screen(self, X):
+        """Return ``(probability, fallback)``: the cascade's class probabilities and which rows reached the forest."""
+        X, p, fallback = self._student_pass(X)
+        probability = np.column_stack([1.0 - p, p])
+        if fallback.any():
+            probability[fallback] = self.predictor.predict_proba(X[fallback])
+        self._count(fallback)
+        return probability, fallback
+
+    def predict_early(self, X, block=8):
+        """Labels from the student where it is confident, else from the forest's :meth:`Predictor.predict_early`.
+
+        Returns ``(labels, trees_used)``; rows the student answered walked no trees of the forest.
+        """
+        X, p, fallback = self._student_pass(X)
+        # Same tie-break as argmax over (1 - p, p)
+        labels = self.classes_[(p > 1.0 - p).astype(np.intp)]
+        trees_used = np.zeros(len(p), dtype=np.intp)
+        if fallback.any():
+            labels[fallback], trees_used[fallback] = self.predictor.predict_early(X[fallback], block)
+        self._count(fallback)
+        return labels, trees_used
+
+    def predict_proba(self, X):
+        return self.screen(X)[0]
+
+    def predict_many(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": self.rows,
+                "fallbacks": self.fallbacks,
+                "fallback_rate": self.fallbacks / self.rows if self.rows else 0.0,
+                "band": self.band,
+            }
+
+
+def fit_student(predictor, X, kind="tree", max_depth=3, seed=42):
+    """Distill ``predictor`` into a :class:`Student` on the rows ``X``; its band still has to be calibrated."""
+    X = predictor._inputs(X)
+    labels = predictor.predict_many(X)
+    if len(np.unique(labels)) < 2:
+        raise ValueError("The forest predicts a single class on these samples; there is nothing to distill.")
+    if predictor.scaler is not None:
+        mean, scale = scaler_params(predictor.scaler, X.shape[1])
+    else:
+        # Fused and artifact forests may carry no scaler; standardize with the samples' own statistics
+        mean, scale = np.nanmean(X, axis=0), np.nanstd(X, axis=0)
+        scale[scale == 0.0] = 1.0
+    Z = (X - mean) / scale
+    if kind == "tree":
+        from sklearn.ensemble import RandomForestClassifier
+        # One unbootstrapped tree over every feature, so CompiledForest evaluates it like the real forest
+        model = RandomForestClassifier(n_estimators=1, max_depth=max_depth, max_features=None, bootstrap=False,
+                                       random_state=seed).fit(Z, labels)
+    elif kind == "linear":
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(max_iter=1000).fit(np.nan_to_num(Z), labels)
+    else:
+        raise ValueError(f"Unknown student '{kind}'. Expected one of: {', '.join(STUDENTS)}")
+    return Student(kind, model, mean, scale, band=(0.0, 1.0), feature_order=predictor.feature_order)
+
+
+def agreement(student_p, forest_labels, classes, band):
+    """``(agreement, fallback_rate)`` of the cascade with band ``band`` against the forest's labels."""
+    low, high = band
+    fallback = ~((student_p < low) | (student_p > high))
+    student_labels = classes[(student_p > 0.5).astype(int)]
+    disagree = ~fallback & (student_labels != forest_labels)
+    return 1.0 - disagree.mean(), fallback.mean()
+
+
+def calibrate(student, predictor, X, min_agreement=0.995, step=0.01):
+    """Narrowest band ``(0.5 - w, 0.5 + w)`` whose agreement with the forest on ``X`` is at least ``min_agreement``.
+
+    The widest band sends every row to the forest, so a band is always found.
+    """
+    X = predictor._inputs(X)
+    p = student.proba(X)
+    forest_labels = predictor.predict_many(X)
+    for width in np.append(np.arange(0.0, 0.5, step), 0.5):
+        band = (0.5 - width, 0.5 + width)
+        if agreement(p, forest_labels, predictor.classes_, band)[0] >= min_agreement:
+            return band
+    return (0.0, 1.0)
+
+
+def evaluate(cascade, X, repeat=3):
+    """Agreement with the forest, fallback rate and both timings on ``X``."""
+    X = cascade.predictor._inputs(X)
+    forest_seconds = min(_timed(cascade.predictor.predict_proba, X) for _ in range(repeat))
+    cascade_seconds = min(_timed(cascade.screen, X) for _ in range(repeat))
+    probability, fallback = cascade.screen(X)
+    labels = cascade.classes_[probability.argmax(axis=1)]
+    return {
+        "rows": len(X),
+        "agreement": float((labels == cascade.predictor.predict_many(X)).mean()),
+        "fallback_rate": float(fallback.mean()),
+        "forest_seconds": forest_seconds,
+        "cascade_seconds": cascade_seconds,
+    }
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distill the forest into a fast screening model for cascade scoring.")
+    parser.add_argument("--data", required=True, help="CSV with the EXPECTED_FEATURE_ORDER columns; labels are not needed")
+    parser.add_argument("--student", choices=STUDENTS, default="tree", help="shallow decision tree or logistic regression")
+    parser.add_argument("--max-depth", type=int, default=3, help="depth of the tree student")
+    parser.add_argument("--min-agreement", type=float, default=0.995, help="required share of labels matching the forest")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=CASCADE_PATH, help="where to write the student (joblib)")
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="flat-array artifact directory, preferred when present")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    predictor = Predictor.load(args.model, args.scaler, args.artifact)
+    data = pd.read_csv(args.data)
+    X = predictor.to_array(data)
+    if predictor.imputer is None:
+        X = X[~np.isnan(X).any(axis=1)]
+    # Fit, calibrate the band and report on three disjoint shares of the samples
+    order = np.random.default_rng(args.seed).permutation(len(X))
+    fit_rows, calibration_rows, test_rows = np.array_split(order, [len(X) // 2, 3 * len(X) // 4])
+
+    student = fit_student(predictor, X[fit_rows], args.student, args.max_depth, args.seed)
+    student.band = calibrate(student, predictor, X[calibration_rows], args.min_agreement)
+    report = evaluate(CascadePredictor(predictor, student), X[test_rows])
+    student.agreement = report["agreement"]
+    student.fallback_rate = report["fallback_rate"]
+    save_student(student, args.output)
+
+    low, high = student.band
+    print(f"{args.student} student, fallback band [{low:.2f}, {high:.2f}] on {report['rows']} held-out rows:")
+    print(f"  agreement with the forest {report['agreement']:.2%}, fallback rate {report['fallback_rate']:.1%}")
+    print(f"  forest {report['forest_seconds'] * 1000:.2f} ms, cascade {report['cascade_seconds'] * 1000:.2f} ms "
+          f"({report['forest_seconds'] / report['cascade_seconds']:.1f}x)")
+    if report["fallback_rate"] == 1.0:
+        print("The student is never confident enough to answer on its own; try a deeper student or a lower --min-agreement.",
+              file=sys.stderr)
+    elif report["agreement"] < args.min_agreement:
+        print(f"Held-out agreement is below {args.min_agreement}; consider more data or a deeper student.", file=sys.stderr)
+    print(f"Wrote {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""Helpers for the charts the pages render once and cache."""
+import io
+
+
+def figure_to_png(fig):
+    """Render a matplotlib figure to PNG bytes and close it."""
+    import matplotlib.pyplot as plt
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
@@ -0,0 +1,207 @@
+"""Batched search for the smallest parameter change that flips a prediction."""
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from safesip.features import PARAM_INFO
+
+
+class Counterfactual(NamedTuple):
+    values: dict
+    # Parameter -> (original value, suggested value), only for parameters that change
+    changes: dict
+    # Sum of absolute changes, each as a fraction of the parameter's slider range
+    distance: float
+    probability: float
+
+
+class _Search:
+    def __init__(self, predictor, x0, target, n_results, param_info):
+        keys = predictor.feature_order
+        self.predictor = predictor
+        self.x0 = x0
+        self.target_column = int(np.flatnonzero(predictor.classes_ == target)[0])
+        self.n_results = n_results
+        self.step = np.array([param_info[key]["step"] for key in keys])
+        self.low = np.array([param_info[key]["min"] for key in keys])
+        self.high = np.array([param_info[key]["max"] for key in keys])
+        self.span = self.high - self.low
+        # Which parameters change -> (row, distance, probability); one result per set keeps the options distinct
+        self.found = {}
+        # Results already tried without each changed parameter, and rows known to carry a needless change
+        self.checked = set()
+        self.needless = set()
+        self.scored = 0
+
+    def distance(self, X):
+        return (np.abs(X - self.x0) / self.span).sum(axis=1)
+
+    def changed(self, row):
+        return ~np.isclose(row, self.x0, rtol=0.0, atol=1e-9)
+
+    def bound(self):
+        """Distance a new candidate has to beat to enter the current top results."""
+        if len(self.found) < self.n_results:
+            return np.inf
+        return sorted(distance for _, distance, _ in self.found.values())[self.n_results - 1]
+
+    def progress(self):
+        """``(number of results, their total distance)``."""
+        return len(self.found), sum(distance for _, distance, _ in self.found.values())
+
+    def snap(self, X):
+        # Whole steps away from the submitted value, kept inside the slider range
+        X = self.x0 + np.round((X - self.x0) / self.step) * self.step
+        # Rounding drops float drift such as 3.4000000000000004 from the suggested values
+        return np.round(np.clip(X, self.low, self.high), 10)
+
+    def score(self, X):
+        """Score the candidates that could still improve the results; prune the rest first."""
+        distance = self.distance(X)
+        keep = (distance < self.bound()) & (distance > 0)
+        X, distance = X[keep], distance[keep]
+        if not len(X):
+            return
+        probability = self.predictor.predict_proba(X)
+        self.scored += len(X)
+        flipped = probability.argmax(axis=1) == self.target_column
+        for row, row_distance, row_probability in zip(X[flipped], distance[flipped], probability[flipped, self.target_column]):
+            row = tuple(row.tolist())
+            if row not in self.needless:
+                self.add(row, row_distance, row_probability)
+        if len(self.found) > self.n_results:
+            best = sorted(self.found.items(), key=lambda item: item[1][1])[: self.n_results]
+            self.found = dict(best)
+        self.drop_needless_changes()
+
+    def add(self, row, distance, probability):
+        # Grid neighbours changing the same parameters are not real alternatives; keep the closest
+        key = tuple(self.changed(np.array(row)).tolist())
+        if key not in self.found or distance < self.found[key][1]:
+            self.found[key] = (row, float(distance), float(probability))
+
+    def drop_needless_changes(self):
+        """Reset each changed parameter of the results to the submitted value and keep the smaller row if it still flips.
+
+        Otherwise the best change plus a one-step nudge elsewhere would show up as a second option.
+        """
+        while True:
+            parents, candidates = [], []
+            for key, (row, _, _) in list(self.found.items()):
+                if row in self.checked:
+                    continue
+                self.checked.add(row)
+                changed = np.flatnonzero(key)
+                if len(changed) < 2:
+                    continue
+                X = np.repeat(np.array(row)[np.newaxis, :], len(changed), axis=0)
+                X[np.arange(len(changed)), changed] = self.x0[changed]
+                parents.append((key, row, len(changed)))
+                candidates.append(X)
+            if not candidates:
+                return
+            X = np.concatenate(candidates)
+            distance = self.distance(X)
+            probability = self.predictor.predict_proba(X)
+            self.scored += len(X)
+            flipped = probability.argmax(axis=1) == self.target_column
+            start = 0
+            for key, row, n in parents:
+                rows = slice(start, start + n)
+                start += n
+                if not flipped[rows].any():
+                    continue
+                best = start - n + int(np.argmin(np.where(flipped[rows], distance[rows], np.inf)))
+                self.needless.add(row)
+                if self.found.get(key, (None,))[0] == row:
+                    del self.found[key]
+                self.add(tuple(X[best].tolist()), distance[best], probability[best, self.target_column])
+
+    def single_parameter_sweeps(self):
+        candidates = []
+        for i in range(len(self.x0)):
+            grid = np.arange(self.low[i], self.high[i] + self.step[i] / 2, self.step[i])
+            X = np.repeat(self.x0[np.newaxis, :], len(grid), axis=0)
+            X[:, i] = grid
+            candidates.append(self.snap(X))
+        self.score(np.concatenate(candidates))
+
+    def random_neighbours(self, rng, batch_size, max_changed):
+        # Sample within the current best distance so most candidates can still improve on it
+        radius = min(self.bound(), 1.0) if np.isfinite(self.bound()) else 1.0
+        n_features = len(self.x0)
+        X = np.repeat(self.x0[np.newaxis, :], batch_size, axis=0)
+        n_changed = rng.integers(1, max_changed + 1, size=batch_size)
+        order = np.argsort(rng.random((batch_size, n_features)), axis=1)
+        changed = np.zeros((batch_size, n_features), dtype=bool)
+        np.put_along_axis(changed, order, np.arange(n_features) < n_changed[:, np.newaxis], axis=1)
+        offsets = rng.uniform(-radius, radius, size=(batch_size, n_features)) * self.span
+        X[changed] += offsets[changed]
+        self.score(self.snap(X))
+
+    def shrink(self):
+        """Move each changed parameter of the best results back toward the submitted value."""
+        candidates = []
+        for row, _, _ in list(self.found.values()):
+            row = np.array(row)
+            for i in np.flatnonzero(self.changed(row)):
+                n_steps = int(round(abs(row[i] - self.x0[i]) / self.step[i]))
+                if n_steps <= 1:
+                    continue
+                X = np.repeat(row[np.newaxis, :], n_steps - 1, axis=0)
+                X[:, i] = self.x0[i] + np.sign(row[i] - self.x0[i]) * self.step[i] * np.arange(1, n_steps)
+                candidates.append(X)
+        if candidates:
+            self.score(self.snap(np.concatenate(candidates)))
+
+    def results(self, feature_order):
+        out = []
+        for row, distance, probability in sorted(self.found.values(), key=lambda item: item[1]):
+            values = dict(zip(feature_order, row))
+            changed = self.changed(np.array(row))
+            changes = {
+                key: (float(original), float(value))
+                for key, original, value, is_changed in zip(feature_order, self.x0, row, changed)
+                if is_changed
+            }
+            out.append(Counterfactual(values, changes, distance, probability))
+        return out
+
+
+def find_counterfactuals(predictor, sample, target=1, n_results=3, time_budget=1.0, batch_size=8192,
+                         max_changed=3, param_info=PARAM_INFO, seed=0, patience=3, tolerance=0.01):
+    """Return up to ``n_results`` nearby samples that ``predictor`` classifies as ``target``.
+
+    Candidates live on the ``param_info`` step grid around ``sample`` and are
+    generated and scored in large batches: first every single-parameter
+    change, then random neighbours within the best distance found so far plus
+    a walk of the best results back toward the sample. Candidates that cannot
+    beat the current results are pruned before scoring. Each result changes a
+    different set of parameters, so the options are real alternatives rather
+    than grid neighbours, and a change a result does not need to flip the
+    prediction is dropped. The search stops after ``patience`` rounds that
+    neither add a result nor cut the results' total distance by more than
+    ``tolerance``, or once ``time_budget`` seconds have passed; results are
+    sorted by distance.
+    """
+    deadline = time.perf_counter() + time_budget
+    x0 = predictor.to_array(sample)[0]
+    search = _Search(predictor, x0, target, n_results, param_info)
+    rng = np.random.default_rng(seed)
+
+    search.single_parameter_sweeps()
+    best_n, best_total = search.progress()
+    stale_rounds = 0
+    while time.perf_counter() < deadline and stale_rounds < patience:
+        search.shrink()
+        if time.perf_counter() >= deadline:
+            break
+        search.random_neighbours(rng, batch_size, max_changed)
+        n_found, total = search.progress()
+        # More results beat closer ones; shaving the last grid steps off the results does not count as progress
+        improved = n_found > best_n or (n_found == best_n and total < best_total * (1.0 - tolerance))
+        if n_found > best_n or (n_found == best_n and total < best_total):
+            best_n, best_total = n_found, total
+        stale_rounds = 0 if improved else stale_rounds + 1
+    return search.results(predictor.feature_order)
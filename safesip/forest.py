@@ -0,0 +1,316 @@
+"""Array-based evaluation of a fitted Random Forest classifier."""
+import numpy as np
+
+_SIGN_BIT = np.uint64(1 << 63)
+
+
+def _ordered_keys(x):
+    # Map float64 values to uint64 keys that sort in the same order
+    bits = x.view(np.uint64)
+    return np.where(bits & _SIGN_BIT, ~bits, bits | _SIGN_BIT)
+
+
+def _from_ordered_keys(keys):
+    bits = np.where(keys & _SIGN_BIT, keys ^ _SIGN_BIT, ~keys)
+    return bits.view(np.float64)
+
+
+def _goes_left(x, threshold, mean, scale):
+    with np.errstate(over="ignore", invalid="ignore"):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+
+def _raw_thresholds(threshold, mean, scale):
+    """Largest raw value per split that still goes left after scaling."""
+    largest = np.finfo(np.float64).max
+    lo = np.full(threshold.shape, _ordered_keys(np.array(-largest))[()], dtype=np.uint64)
+    hi = np.full(threshold.shape, _ordered_keys(np.array(largest))[()], dtype=np.uint64)
+    # Invariant: lo goes left, hi does not
+    for _ in range(64):
+        mid = lo + (hi - lo) // np.uint64(2)
+        left = _goes_left(_from_ordered_keys(mid), threshold, mean, scale)
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+    raw = _from_ordered_keys(lo)
+    raw[~_goes_left(np.full_like(threshold, -largest), threshold, mean, scale)] = -np.inf
+    raw[_goes_left(np.full_like(threshold, largest), threshold, mean, scale)] = np.inf
+    return raw
+
+
+class CompiledForest:
+    """Every tree of a fitted forest flattened into contiguous NumPy arrays.
+
+    Node ``i`` of tree ``t`` lives at ``roots[t] + i``. Leaves point back at
+    themselves, and each traversal step only touches the (row, tree) pairs
+    that have not reached a leaf yet.
+    ``predict_proba`` matches ``RandomForestClassifier.predict_proba`` bit for
+    bit: inputs are compared as float32, like sklearn does, and the per-tree
+    leaf values are accumulated in tree order.
+
+    A forest returned by :meth:`fold_scaler` has its thresholds rewritten into
+    raw parameter units (``raw_input=True``) and scores unscaled float64
+    inputs directly, with the same results as scaling first.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, values, roots, max_depth, classes,
+                 raw_input=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.raw_input = bool(raw_input)
+        self.is_leaf = left == np.arange(len(left))
+
+    @classmethod
+    def from_model(cls, model):
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled.")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            if missing_go_to_left is None:
+                missing_go_to_left = np.zeros(n_nodes, dtype=bool)
+            missing.append(np.asarray(missing_go_to_left, dtype=bool))
+
+            leaf_values = tree.value[:, 0, :].astype(np.float64)
+            totals = leaf_values.sum(axis=1)
+            # Older sklearn versions store class counts and normalize in predict_proba
+            if not np.allclose(totals[is_leaf], 1.0):
+                totals[totals == 0.0] = 1.0
+                leaf_values = leaf_values / totals[:, np.newaxis]
+            values.append(leaf_values)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            values=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def fold_scaler(self, mean, scale):
+        """Return a copy that takes raw inputs for a ``(X - mean) / scale`` scaler.
+
+        sklearn scales in float64 and then compares ``float32(z) <= threshold``.
+        Both steps are monotonic in the raw value, so every split is equivalent
+        to ``x <= R`` for the largest double ``R`` that still goes left. ``R`` is
+        found by bisecting over the ordered float64 bit patterns, which keeps the
+        fused forest bit-for-bit consistent with scaler + model.
+        """
+        if self.raw_input:
+            raise ValueError("The forest already takes raw inputs.")
+        internal = ~self.is_leaf
+        mean = np.asarray(mean, dtype=np.float64)[self.feature[internal]]
+        scale = np.asarray(scale, dtype=np.float64)[self.feature[internal]]
+        threshold = self.threshold.copy()
+        threshold[internal] = _raw_thresholds(self.threshold[internal], mean, scale)
+        return CompiledForest(
+            feature=self.feature,
+            threshold=threshold,
+            left=self.left,
+            right=self.right,
+            missing_left=self.missing_left,
+            values=self.values,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            raw_input=True,
+        )
+
+    def save(self, path, feature_order=None):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            missing_left=self.missing_left,
+            values=self.values,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            raw_input=self.raw_input,
+            feature_order=np.asarray(feature_order if feature_order is not None else [], dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a forest saved with :meth:`save`; returns ``(forest, feature_order)``."""
+        with np.load(path) as data:
+            forest = cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                missing_left=data["missing_left"],
+                values=data["values"],
+                roots=data["roots"],
+                max_depth=data["max_depth"],
+                classes=data["classes"],
+                raw_input=data["raw_input"],
+            )
+            feature_order = [str(name) for name in data["feature_order"]] or None
+        return forest, feature_order
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float64 if self.raw_input else np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)."""
+        X = self._prepare(X)
+        nodes = np.tile(self.roots, X.shape[0])
+        for _ in self._steps(X, nodes):
+            pass
+        return nodes.reshape(X.shape[0], self.n_trees)
+
+    def _steps(self, X, nodes, n_trees=None):
+        """Move every (row, tree) pair in ``nodes`` down to its leaf, in place.
+
+        ``nodes`` holds ``n_trees`` (default: all) entries per row of ``X``.
+        Only unsettled pairs are stepped. Each step yields the flat indices of
+        the pairs that moved together with the nodes they left.
+        """
+        # Flat index into X for each (row, tree) pair
+        row_offsets = np.repeat(np.arange(X.shape[0]) * X.shape[1], n_trees or self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        X_flat = X.ravel()
+        while active.size:
+            parents = nodes[active]
+            x = X_flat[row_offsets[active] + self.feature[parents]]
+            go_left = x <= self.threshold[parents]
+            go_left |= np.isnan(x) & self.missing_left[parents]
+            current = np.where(go_left, self.left[parents], self.right[parents])
+            nodes[active] = current
+            yield active, parents
+            active = active[~self.is_leaf[current]]
+
+    def contributions(self, X):
+        """Decompose each prediction into a bias plus one term per feature.
+
+        Following the treeinterpreter approach, every split on a decision path
+        credits its feature with the change in node value it causes. Averaged
+        over trees, ``bias + contributions.sum(axis=1)`` reproduces
+        ``predict_proba`` up to float rounding. Returns ``bias`` with shape
+        (n_samples, n_classes) and ``contributions`` with shape
+        (n_samples, n_features, n_classes).
+        """
+        X = self._prepare(X)
+        n_samples, n_features = X.shape
+        n_classes = self.values.shape[1]
+        nodes = np.tile(self.roots, n_samples)
+        bias = np.broadcast_to(self.values[self.roots].mean(axis=0), (n_samples, n_classes)).copy()
+        totals = np.zeros((n_samples * n_features, n_classes))
+        for pairs, parents in self._steps(X, nodes):
+            delta = self.values[nodes[pairs]] - self.values[parents]
+            slots = (pairs // self.n_trees) * n_features + self.feature[parents]
+            for k in range(n_classes):
+                totals[:, k] += np.bincount(slots, weights=delta[:, k], minlength=totals.shape[0])
+        return bias, totals.reshape(n_samples, n_features, n_classes) / self.n_trees
+
+    def tree_proba(self, X):
+        """Per-tree class probabilities, shape (n_samples, n_trees, n_classes)."""
+        return self.values[self.apply(X)]
+
+    @staticmethod
+    def average(tree_proba):
+        """Average per-tree probabilities exactly as the sklearn forest does."""
+        # cumsum adds trees strictly in order, matching sklearn's running total
+        proba = np.cumsum(tree_proba, axis=1)[:, -1, :]
+        proba /= tree_proba.shape[1]
+        return proba
+
+    def predict_proba(self, X):
+        return self.average(self.tree_proba(X))
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_early(self, X, block=8):
+        """Labels identical to :meth:`predict`, walking only as many trees as each row needs.
+
+        See :func:`vote_early`. Returns ``(labels, trees_used)``; probabilities
+        need every tree, so ask :meth:`predict_proba` for those.
+        """
+        X = self._prepare(X)
+
+        def accumulate(rows, start, stop, running):
+            roots = self.roots[start:stop]
+            nodes = np.tile(roots, len(rows))
+            for _ in self._steps(X[rows], nodes, len(roots)):
+                pass
+            leaf_values = self.values[nodes.reshape(len(rows), len(roots))]
+            for j in range(len(roots)):
+                running += leaf_values[:, j]
+
+        return vote_early(accumulate, X.shape[0], self.n_trees, self.classes_, block)
+
+
+def vote_early(accumulate, n_rows, n_trees, classes, block=8):
+    """Sum per-tree class probabilities in tree order, retiring each row once its label is settled.
+
+    ``accumulate(rows, start, stop, running)`` adds the probabilities of trees
+    ``start:stop`` for the given rows to ``running`` (shape (len(rows),
+    n_classes)) in place, one tree at a time. A tree moves the gap between two
+    classes' summed probabilities by at most 1, so a row is retired as soon as
+    its leading class is ahead of every other by more than the number of trees
+    left; no later tree can change its label. Rows that never settle are summed
+    over every tree in the order sklearn sums them, so every label matches
+    ``predict``. Returns ``(labels, trees_used)``.
+    """
+    totals = np.zeros((n_rows, len(classes)))
+    labels = np.empty(n_rows, dtype=np.asarray(classes).dtype)
+    trees_used = np.full(n_rows, n_trees, dtype=np.intp)
+    # Far below any lead that matters, far above the rounding in a sum of n_trees values
+    tolerance = 1e-9 * n_trees
+    active = np.arange(n_rows)
+    # No class can be ahead by more than the remaining trees until over half have voted
+    start, stop = 0, min(n_trees // 2 + 1, n_trees)
+    while active.size:
+        running = totals[active]
+        accumulate(active, start, stop, running)
+        totals[active] = running
+
+        remaining = n_trees - stop
+        if remaining and running.shape[1] > 1:
+            top_two = np.partition(running, running.shape[1] - 2, axis=1)[:, -2:]
+            settled = top_two[:, 1] - top_two[:, 0] > remaining + tolerance
+        else:
+            settled = np.full(active.size, not remaining)
+        done = active[settled]
+        labels[done] = classes[running[settled].argmax(axis=1)]
+        trees_used[done] = stop
+        active = active[~settled]
+        start, stop = stop, min(stop + block, n_trees)
+    return labels, trees_used
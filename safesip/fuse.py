@@ -0,0 +1,40 @@
+"""Build a fused model artifact that scores raw parameter values.
+
+Usage::
+
+    python -m safesip.fuse --model random_forest_model.joblib \
+        --scaler random_forest_scaler.joblib --output random_forest_fused.npz
+"""
+import argparse
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.forest import CompiledForest
+from safesip.predictor import FUSED_PATH, MODEL_PATH, SCALER_PATH, load_model, load_scaler, scaler_params
+
+
+def fuse_model_and_scaler(model, scaler, feature_order=EXPECTED_FEATURE_ORDER):
+    """Compile ``model`` and fold ``scaler`` into its split thresholds."""
+    forest = CompiledForest.from_model(model)
+    return forest.fold_scaler(*scaler_params(scaler, len(feature_order)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fold the StandardScaler into the Random Forest thresholds.")
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--output", default=FUSED_PATH, help="where to write the fused .npz artifact")
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model)
+    scaler = load_scaler(args.scaler)
+    feature_order = list(getattr(scaler, "feature_names_in_", EXPECTED_FEATURE_ORDER))
+    if feature_order != EXPECTED_FEATURE_ORDER:
+        parser.error(f"Scaler feature order {feature_order} does not match {EXPECTED_FEATURE_ORDER}.")
+
+    forest = fuse_model_and_scaler(model, scaler, feature_order)
+    forest.save(args.output, feature_order=feature_order)
+    print(f"Wrote {args.output}: {forest.n_trees} trees, {len(forest.threshold)} nodes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Import-time report for the app's entry points, checked against a startup budget.
+
+Each target's module-level imports are timed in a fresh interpreter with
+``python -X importtime``. Imports made inside functions are deliberately not
+counted: deferring heavy libraries to the code paths that need them is what
+keeps cold starts fast.
+
+Usage::
+
+    python -m safesip.importtime            # print the report
+    python -m safesip.importtime --check    # also exit with status 1 if a target is over budget
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget per entry point, in milliseconds
+BUDGETS_MS = {
+    "safesip": 200,
+    "app.py": 750,
+    "pages/about.py": 750,
+    "pages/analyze.py": 1250,
+}
+
+
+def module_level_imports(path):
+    """Names of the modules a script imports at module level."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def target_imports(target):
+    if target.endswith(".py"):
+        return module_level_imports(os.path.join(ROOT, target))
+    return [target]
+
+
+def parse_importtime(stderr):
+    """Return ``[(module, self_us, cumulative_us, depth)]`` from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented by two spaces per level after the leading space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def run_importtime(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(modules, repeat=3):
+    """Import ``modules`` in fresh interpreters and keep the fastest run.
+
+    Modules the interpreter loads before running any code (``site``,
+    ``encodings``...) are left out of the totals.
+    """
+    statement = "; ".join(f"import {module}" for module in modules) or "pass"
+    startup = {name for name, _, _, depth in run_importtime("pass") if depth == 0}
+    best = None
+    for _ in range(repeat):
+        rows = [row for row in run_importtime(statement) if row[3] > 0 or row[0] not in startup]
+        total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def report(targets, repeat=3, top=8):
+    """Print the per-target breakdown; return the targets that are over budget."""
+    over_budget = []
+    for target in targets:
+        modules = target_imports(target)
+        total_us, rows = measure(modules, repeat)
+        budget_ms = BUDGETS_MS.get(target)
+        status = "" if budget_ms is None else f" (budget {budget_ms} ms)"
+        if budget_ms is not None and total_us / 1000 > budget_ms:
+            status += " OVER BUDGET"
+            over_budget.append(target)
+        print(f"{target}: {total_us / 1000:.1f} ms{status}")
+        print(f"  module-level imports: {', '.join(modules) or '-'}")
+        top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: -row[2])
+        for name, _, cumulative, _ in top_level[:top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    return over_budget
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start import time for each entry point.")
+    parser.add_argument("targets", nargs="*", default=list(BUDGETS_MS), help="modules or script paths relative to the repo root")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target; the fastest run is reported")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list per target")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any target exceeds its budget")
+    args = parser.parse_args(argv)
+
+    over_budget = report(args.targets, args.repeat, args.top)
+    if args.check and over_budget:
+        print(f"Over the startup budget: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Fit the missing-value imputer that is saved next to the scaler.
+
+Usage::
+
+    python -m safesip.impute --data water_potability.csv --output random_forest_imputer.joblib
+
+The imputer is a plain sklearn ``SimpleImputer`` fitted on the training
+columns in ``EXPECTED_FEATURE_ORDER``. At prediction time only its fill values
+are used, as one ``np.where`` over the whole batch (see
+:meth:`Predictor.impute`), so a batch with scattered gaps is scored in one pass.
+"""
+import argparse
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.predictor import IMPUTER_PATH
+
+STRATEGIES = ("median", "mean")
+
+
+def fit_imputer(X, strategy="median", feature_order=EXPECTED_FEATURE_ORDER):
+    """Fit a SimpleImputer on the ``feature_order`` columns of the DataFrame ``X``."""
+    from sklearn.impute import SimpleImputer
+
+    missing = [col for col in feature_order if col not in X.columns]
+    if missing:
+        raise ValueError(f"Training data is missing the columns: {', '.join(missing)}")
+    return SimpleImputer(strategy=strategy).fit(X[list(feature_order)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit the missing-value imputer used before scaling.")
+    parser.add_argument("--data", required=True, help="training CSV with the EXPECTED_FEATURE_ORDER columns")
+    parser.add_argument("--output", default=IMPUTER_PATH, help="where to write the fitted imputer (joblib)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="median", help="fill value computed per feature")
+    args = parser.parse_args(argv)
+
+    import joblib
+    import pandas as pd
+
+    data = pd.read_csv(args.data)
+    imputer = fit_imputer(data, args.strategy)
+    joblib.dump(imputer, args.output)
+    missing = data[EXPECTED_FEATURE_ORDER].isna().sum()
+    print(f"Wrote {args.output} ({args.strategy} of {len(data)} rows).")
+    for feature, fill in zip(EXPECTED_FEATURE_ORDER, imputer.statistics_):
+        print(f"  {feature}: {fill:g} ({missing[feature]} missing in the training data)")
+
+
+if __name__ == "__main__":
+    main()
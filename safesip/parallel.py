@@ -0,0 +1,206 @@
+"""Score large batches on every core with a pool of worker processes.
+
+Each worker loads the model once, in the pool initializer. With the
+flat-array artifact present that load is a memory map, so all workers share
+one copy of the forest through the OS page cache. Input rows are split into
+contiguous shards, scored in parallel and reassembled in input order.
+
+:class:`ParallelScorer` has the same ``predict_proba``/``classes_``/
+``feature_order`` surface as :class:`~safesip.predictor.Predictor`, so it can
+stand in for one wherever a batch is scored::
+
+    python -m safesip.score archive.parquet -o scored.parquet --workers 32
+    python -m safesip.parallel readings.csv --scaling 1,2,4,8,16,32
+
+The second form reports the speed-up and scaling efficiency of each worker
+count against the single-process path.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.predictor import ARTIFACT_PATH, MODEL_PATH, SCALER_PATH, Predictor
+
+# Set in each worker process by _init_worker
+_worker_predictor = None
+
+
+def _init_worker(model_path, scaler_path, artifact_path, engine):
+    global _worker_predictor
+    _worker_predictor = Predictor.load(model_path, scaler_path, artifact_path, engine=engine)
+
+
+def _predict_shard(X):
+    return _worker_predictor.predict_proba(X)
+
+
+def _predict_early_shard(X):
+    return _worker_predictor.predict_early(X)
+
+
+def default_workers():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class ParallelScorer:
+    """A process pool that scores batches with one model instance per worker.
+
+    Batches smaller than ``min_parallel_rows`` are scored in this process,
+    where shipping them to the workers would cost more than it saves.
+    """
+
+    def __init__(self, n_workers=None, model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH,
+                 engine="compiled", shard_rows=16_384, min_parallel_rows=4_096):
+        self.n_workers = n_workers or default_workers()
+        self.shard_rows = shard_rows
+        self.min_parallel_rows = min_parallel_rows
+        self.predictor = Predictor.load(model_path, scaler_path, artifact_path, engine=engine)
+        start = time.perf_counter()
+        self._pool = ProcessPoolExecutor(
+            self.n_workers,
+            initializer=_init_worker,
+            initargs=(model_path, scaler_path, artifact_path, engine),
+        )
+        # Start every worker and load the model now, so the first batch is not charged for it
+        list(self._pool.map(_predict_shard, [self.predictor.to_array(np.zeros(len(self.feature_order)))] * self.n_workers))
+        self.startup_seconds = time.perf_counter() - start
+
+    @property
+    def feature_order(self):
+        return self.predictor.feature_order
+
+    @property
+    def classes_(self):
+        return self.predictor.classes_
+
+    @property
+    def imputer(self):
+        # Every worker loads the same imputer; score_frame checks for it to decide whether gappy rows can be scored
+        return self.predictor.imputer
+
+    def to_array(self, X):
+        return self.predictor.to_array(X)
+
+    def shards(self, n_rows):
+        """Row ranges that give every worker a similar share, each at most ``shard_rows`` long."""
+        n_shards = max(self.n_workers, -(-n_rows // self.shard_rows))
+        bounds = np.linspace(0, n_rows, n_shards + 1).astype(int)
+        return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+    def predict_proba(self, X):
+        X = self.to_array(X)
+        if X.shape[0] < self.min_parallel_rows:
+            return self.predictor.predict_proba(X)
+        # map() yields results in submission order, which is input order
+        parts = self._pool.map(_predict_shard, [X[start:stop] for start, stop in self.shards(X.shape[0])])
+        return np.concatenate(list(parts))
+
+    def predict_many(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_early(self, X):
+        """Labels and trees walked per row; see :meth:`Predictor.predict_early`."""
+        X = self.to_array(X)
+        if X.shape[0] < self.min_parallel_rows:
+            return self.predictor.predict_early(X)
+        parts = list(self._pool.map(_predict_early_shard, [X[start:stop] for start, stop in self.shards(X.shape[0])]))
+        return np.concatenate([labels for labels, _ in parts]), np.concatenate([trees_used for _, trees_used in parts])
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def scaling_report(X, worker_counts, repeat=3, **scorer_kwargs):
+    """Time ``X`` on the single-process path and on a pool of each size in ``worker_counts``.
+
+    Returns ``(single_seconds, rows)`` with one ``(n_workers, seconds, speedup,
+    efficiency, startup_seconds, identical)`` row per worker count; the best of
+    ``repeat`` runs is kept and pool start-up is reported separately.
+    """
+    predictor = Predictor.load(
+        scorer_kwargs.get("model_path", MODEL_PATH),
+        scorer_kwargs.get("scaler_path", SCALER_PATH),
+        scorer_kwargs.get("artifact_path", ARTIFACT_PATH),
+        engine=scorer_kwargs.get("engine", "compiled"),
+    )
+    X = predictor.to_array(X)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        expected = predictor.predict_proba(X)
+        timings.append(time.perf_counter() - start)
+    single_seconds = min(timings)
+
+    rows = []
+    for n_workers in worker_counts:
+        with ParallelScorer(n_workers, **scorer_kwargs) as scorer:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                probability = scorer.predict_proba(X)
+                timings.append(time.perf_counter() - start)
+            seconds = min(timings)
+            speedup = single_seconds / seconds
+            identical = np.array_equal(probability, expected)
+            rows.append((n_workers, seconds, speedup, speedup / n_workers, scorer.startup_seconds, identical))
+    return single_seconds, rows
+
+
+def read_features(path, feature_order):
+    """Load the feature columns of a CSV, Parquet or .npy file, dropping rows that cannot be scored."""
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    import pandas as pd
+    frame = pd.read_parquet(path, columns=feature_order) if path.endswith((".parquet", ".pq")) else pd.read_csv(path, usecols=feature_order)
+    features = frame[feature_order].apply(pd.to_numeric, errors="coerce").dropna()
+    return features.to_numpy(dtype=np.float64)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report how batch scoring scales across worker processes.")
+    parser.add_argument("input", help="CSV, Parquet or .npy file of samples")
+    parser.add_argument("--scaling", default=None, help="comma-separated worker counts (default: 1, 2, 4... up to the core count)")
+    parser.add_argument("--shard-rows", type=int, default=16_384, help="largest row range sent to one worker at a time")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per configuration; the fastest is reported")
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="flat-array artifact directory, preferred when present")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        worker_counts = [int(n) for n in args.scaling.split(",")]
+    else:
+        worker_counts = [1 << i for i in range(default_workers().bit_length()) if 1 << i <= default_workers()]
+        if worker_counts[-1] != default_workers():
+            worker_counts.append(default_workers())
+
+    X = read_features(args.input, EXPECTED_FEATURE_ORDER)
+    single_seconds, rows = scaling_report(
+        X, worker_counts, args.repeat,
+        model_path=args.model, scaler_path=args.scaler, artifact_path=args.artifact, shard_rows=args.shard_rows,
+    )
+    print(f"{len(X)} rows; single process {single_seconds:.3f}s ({len(X) / single_seconds:,.0f} rows/s)")
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>12} {'speed-up':>8} {'efficiency':>10} {'start-up':>8}  identical")
+    for n_workers, seconds, speedup, efficiency, startup, identical in rows:
+        print(f"{n_workers:>7} {seconds:>8.3f} {len(X) / seconds:>12,.0f} {speedup:>7.2f}x {efficiency:>9.0%} {startup:>7.2f}s  {identical}")
+    if not all(row[-1] for row in rows):
+        print("Parallel results differ from the single-process path.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Model loading and prediction without any UI dependency."""
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.forest import CompiledForest, vote_early
+
+MODEL_PATH = "random_forest_model.joblib"
+SCALER_PATH = "random_forest_scaler.joblib"
+IMPUTER_PATH = "random_forest_imputer.joblib"
+CASCADE_PATH = "random_forest_cascade.joblib"
+FUSED_PATH = "random_forest_fused.npz"
+ARTIFACT_PATH = "random_forest_model.safesip"
+
+ENGINES = ("sklearn", "compiled", "fused")
+
+
+def model_files(model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH, imputer_path=IMPUTER_PATH,
+                cascade_path=CASCADE_PATH):
+    """Paths whose changes mean a different model is being served."""
+    return (model_path, scaler_path, os.path.join(artifact_path, "meta.json"), imputer_path, cascade_path)
+
+
+def load_model(model_path=MODEL_PATH):
+    import joblib
+    return joblib.load(model_path)
+
+
+def load_scaler(scaler_path=SCALER_PATH):
+    import joblib
+    return joblib.load(scaler_path)
+
+
+def load_imputer(imputer_path=IMPUTER_PATH):
+    """The fitted imputer saved next to the scaler, or None if there is none."""
+    if imputer_path is None or not os.path.exists(imputer_path):
+        return None
+    import joblib
+    return joblib.load(imputer_path)
+
+
+def imputer_params(imputer, n_features):
+    """Return the per-feature fill values a fitted SimpleImputer applies."""
+    fill = getattr(imputer, "statistics_", None)
+    if fill is None or getattr(imputer, "add_indicator", False):
+        raise ValueError(f"{type(imputer).__name__} is not a fitted SimpleImputer without indicator columns.")
+    fill = np.asarray(fill, dtype=np.float64)
+    if fill.shape != (n_features,) or np.isnan(fill).any():
+        raise ValueError(f"Imputer has {fill.size} fill values, expected {n_features} non-missing ones.")
+    return fill
+
+
+def scaler_params(scaler, n_features):
+    """Return the ``(mean, scale)`` arrays a fitted StandardScaler applies."""
+    if not (hasattr(scaler, "mean_") and hasattr(scaler, "scale_")):
+        raise ValueError(f"{type(scaler).__name__} is not a StandardScaler; it cannot be applied as array arithmetic.")
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class Prediction(NamedTuple):
+    label: int
+    probabilities: np.ndarray
+    # Number of trees voting for each class and the spread of per-tree probabilities
+    tree_votes: np.ndarray = None
+    tree_std: np.ndarray = None
+
+    @property
+    def potable_probability(self):
+        return float(self.probabilities[1])
+
+    @property
+    def n_trees(self):
+        return int(self.tree_votes.sum()) if self.tree_votes is not None else None
+
+    @property
+    def margin(self):
+        """Half-width of a ~95% band around each class probability, from the tree spread."""
+        if self.tree_std is None:
+            return None
+        return 1.96 * self.tree_std / np.sqrt(self.n_trees)
+
+
+class Predictor:
+    """Scales raw parameter values and scores them with the loaded model.
+
+    Inputs can be a dict keyed by feature name, a sequence of values in
+    ``EXPECTED_FEATURE_ORDER``, a 2-D array or a DataFrame with those columns.
+
+    ``engine="compiled"`` scores with a :class:`~safesip.forest.CompiledForest`
+    and standardizes inputs with plain array arithmetic, skipping sklearn's
+    per-call validation and per-tree dispatch. Results are identical to the
+    default ``"sklearn"`` engine. Batches larger than ``compiled_max_rows``
+    still go through sklearn, whose C traversal wins once the fixed per-call
+    overhead is amortized.
+
+    ``engine="fused"`` folds the scaler into the split thresholds (see
+    :meth:`CompiledForest.fold_scaler`) and scores raw inputs with no
+    transform step at all. :meth:`from_fused` loads a forest saved by
+    ``python -m safesip.fuse``.
+
+    With an ``imputer`` (a fitted SimpleImputer, see ``python -m
+    safesip.impute``), missing values are filled before scaling; without one
+    they reach the model as NaN.
+    """
+
+    compiled_max_rows = 256
+
+    def __init__(self, model, scaler=None, feature_order=EXPECTED_FEATURE_ORDER, engine="sklearn", imputer=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Expected one of: {', '.join(ENGINES)}")
+        self.model = model
+        self.scaler = scaler
+        self.imputer = imputer
+        self.feature_order = list(feature_order)
+        self._fill = imputer_params(imputer, len(self.feature_order)) if imputer is not None else None
+        self.classes_ = np.asarray(model.classes_)
+        self.engine = engine
+        self.forest = None
+        self._explainer = None
+        # Set by from_artifact, whose forest no longer has the sklearn model to ask
+        self._importances = None
+        if engine == "compiled":
+            self.forest = model if isinstance(model, CompiledForest) else CompiledForest.from_model(model)
+        elif engine == "fused":
+            if isinstance(model, CompiledForest):
+                self.forest = model
+            else:
+                self.forest = CompiledForest.from_model(model)
+                if scaler is not None:
+                    self.forest = self.forest.fold_scaler(*scaler_params(scaler, len(self.feature_order)))
+            if not self.forest.raw_input and scaler is not None:
+                raise ValueError("A fused predictor needs a forest with the scaler folded in.")
+
+    @classmethod
+    def from_files(cls, model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine="sklearn", imputer_path=IMPUTER_PATH):
+        """Unpickle the joblib model and scaler, and the imputer if one is saved next to them."""
+        scaler = load_scaler(scaler_path) if scaler_path is not None else None
+        return cls(load_model(model_path), scaler, engine=engine, imputer=load_imputer(imputer_path))
+
+    @classmethod
+    def from_fused(cls, fused_path=FUSED_PATH, imputer_path=IMPUTER_PATH):
+        forest, feature_order = CompiledForest.load(fused_path)
+        feature_order = feature_order or EXPECTED_FEATURE_ORDER
+        return cls(forest, feature_order=feature_order, engine="fused", imputer=load_imputer(imputer_path))
+
+    @classmethod
+    def from_artifact(cls, artifact_path=ARTIFACT_PATH, mmap_mode="r"):
+        """Load a flat-array artifact written by ``python -m safesip.artifact``.
+
+        The arrays are memory-mapped, so every process on the host shares the
+        page-cache copy instead of holding its own unpickled forest.
+        """
+        from safesip.artifact import load_artifact
+        from safesip.artifact import feature_importances
+        forest, scaler, feature_order, imputer = load_artifact(artifact_path, mmap_mode=mmap_mode)
+        engine = "fused" if forest.raw_input else "compiled"
+        predictor = cls(forest, scaler, feature_order=feature_order, engine=engine, imputer=imputer)
+        predictor._importances = feature_importances(artifact_path)
+        return predictor
+
+    @property
+    def feature_importances_(self):
+        """The forest's impurity-based importances in feature order, or None if they are not known."""
+        importances = getattr(self.model, "feature_importances_", None)
+        return self._importances if importances is None else importances
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH, engine="compiled",
+             imputer_path=IMPUTER_PATH):
+        """Prefer the shared flat-array artifact when it exists, else unpickle the joblib files."""
+        if artifact_path is not None and os.path.isdir(artifact_path):
+            return cls.from_artifact(artifact_path)
+        return cls.from_files(model_path, scaler_path, engine=engine, imputer_path=imputer_path)
+
+    def to_array(self, X):
+        """Return ``X`` as a float64 array with columns in feature order."""
+        if isinstance(X, dict):
+            X = [[X[key] for key in self.feature_order]]
+        elif hasattr(X, "columns"):
+            missing = [col for col in self.feature_order if col not in X.columns]
+            if missing:
+                raise ValueError(f"Input is missing the columns: {', '.join(missing)}")
+            X = X[self.feature_order].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_order):
+            raise ValueError(f"Expected {len(self.feature_order)} features per row, got shape {X.shape}.")
+        return X
+
+    def impute(self, X):
+        """Return ``(X, imputed_rows)``: ``X`` with missing values filled, and which rows had any."""
+        X = self.to_array(X)
+        missing = np.isnan(X)
+        imputed_rows = missing.any(axis=1)
+        if self._fill is not None and imputed_rows.any():
+            X = np.where(missing, self._fill, X)
+        return X, imputed_rows
+
+    def _inputs(self, X):
+        return self.impute(X)[0] if self._fill is not None else self.to_array(X)
+
+    def transform(self, X):
+        X = self._inputs(X)
+        if self.scaler is None:
+            return X
+        if self.forest is not None:
+            # Same arithmetic as StandardScaler.transform, without the validation pass
+            mean, scale = scaler_params(self.scaler, X.shape[1])
+            return (X - mean) / scale
+        if hasattr(self.scaler, "feature_names_in_"):
+            # The scaler was fitted on a DataFrame; keep the names so sklearn does not warn
+            import pandas as pd
+            X = pd.DataFrame(X, columns=self.feature_order)
+        return self.scaler.transform(X)
+
+    def predict_proba(self, X):
+        if self.engine == "fused":
+            return self.forest.predict_proba(self._inputs(X))
+        X = self.transform(X)
+        if self.forest is not None and (X.shape[0] <= self.compiled_max_rows or self.model is self.forest):
+            return self.forest.predict_proba(X)
+        return self.model.predict_proba(X)
+
+    def tree_proba(self, X):
+        """Per-tree class probabilities, shape (n_samples, n_trees, n_classes)."""
+        if self.engine == "fused":
+            return self.forest.tree_proba(self._inputs(X))
+        X = self.transform(X)
+        if self.forest is not None:
+            return self.forest.tree_proba(X)
+        X = np.asarray(X, dtype=np.float32)
+        return np.stack([tree.predict_proba(X, check_input=False) for tree in self.model.estimators_], axis=1)
+
+    def contributions(self, X):
+        """Bias and per-feature contributions for each row; see :meth:`CompiledForest.contributions`."""
+        if self.engine == "fused":
+            return self.forest.contributions(self._inputs(X))
+        if self.forest is not None:
+            return self.forest.contributions(self.transform(X))
+        if self._explainer is None:
+            self._explainer = CompiledForest.from_model(self.model)
+        return self._explainer.contributions(self.transform(X))
+
+    def predict_with_votes(self, X):
+        """Labels, probabilities, per-class tree votes and per-tree spread in one forest pass."""
+        tree_proba = self.tree_proba(X)
+        probability = CompiledForest.average(tree_proba)
+        n_classes = tree_proba.shape[2]
+        votes = np.stack([(tree_proba.argmax(axis=2) == k).sum(axis=1) for k in range(n_classes)], axis=1)
+        labels = self.classes_[probability.argmax(axis=1)]
+        return labels, probability, votes, tree_proba.std(axis=1)
+
+    def predict_many(self, X):
+        probability = self.predict_proba(X)
+        return self.classes_[probability.argmax(axis=1)]
+
+    def predict_early(self, X, block=8):
+        """Labels identical to :meth:`predict_many`, stopping each row's tree walk once its vote is settled.
+
+        Returns ``(labels, trees_used)``. Batches of up to ``compiled_max_rows``
+        rows take one compiled pass over every tree, which costs less than the
+        per-block bookkeeping of stopping early; larger ones walk the sklearn
+        trees (or the compiled forest, when there is no sklearn model) in
+        order, ``block`` at a time, and retire rows as they settle. Use
+        :meth:`predict_proba` when probabilities are needed.
+        """
+        fused = self.engine == "fused"
+        X = self._inputs(X) if fused else self.transform(X)
+        if self.forest is not None and X.shape[0] <= self.compiled_max_rows:
+            return self.forest.predict(X), np.full(X.shape[0], self.forest.n_trees, dtype=np.intp)
+        if fused or self.model is self.forest:
+            return self.forest.predict_early(X, block)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        estimators = self.model.estimators_
+
+        def accumulate(rows, start, stop, running):
+            X_rows = X[rows]
+            for tree in estimators[start:stop]:
+                running += tree.predict_proba(X_rows, check_input=False)
+
+        return vote_early(accumulate, X.shape[0], len(estimators), self.classes_, block)
+
+    def predict_one(self, sample):
+        labels, probability, votes, spread = self.predict_with_votes(sample)
+        if probability.shape[0] != 1:
+            raise ValueError(f"predict_one expects a single sample, got {probability.shape[0]}.")
+        return Prediction(labels[0].item(), probability[0], votes[0], spread[0])
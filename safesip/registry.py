@@ -0,0 +1,208 @@
+"""Process-wide registry that keeps the active model warm and hot-reloads it.
+
+The registry watches the model files (mtime and size, or a content hash) and
+loads a changed model on a background thread. The new predictor is checked
+and exercised before it is published, and publishing is a single reference
+swap: callers that already hold the previous :class:`ModelVersion` finish
+with it, and nobody ever sees a model paired with the wrong scaler, because
+both live inside the same predictor.
+"""
+import hashlib
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from safesip.cache import artifact_version
+from safesip.features import EXPECTED_FEATURE_ORDER, PARAM_INFO
+from safesip.predictor import ARTIFACT_PATH, MODEL_PATH, SCALER_PATH, Predictor, model_files
+
+
+class WarmupReport(NamedTuple):
+    engine: str
+    load_seconds: float
+    # First pass over the dummy batch pays the one-off costs; the second is steady state
+    first_batch_seconds: float
+    steady_batch_seconds: float
+    single_row_seconds: float
+    n_rows: int
+
+    @property
+    def total_seconds(self):
+        return self.load_seconds + self.first_batch_seconds + self.steady_batch_seconds + self.single_row_seconds
+
+
+class ModelVersion(NamedTuple):
+    version: tuple
+    predictor: Predictor
+    loaded_at: float
+    report: WarmupReport
+
+
+def check_feature_order(predictor, feature_order=EXPECTED_FEATURE_ORDER):
+    """Raise ValueError if the loaded artifacts disagree with ``feature_order``."""
+    feature_order = list(feature_order)
+    if predictor.feature_order != feature_order:
+        raise ValueError(f"Predictor feature order {predictor.feature_order} does not match {feature_order}.")
+    scaler_names = getattr(predictor.scaler, "feature_names_in_", None)
+    if scaler_names is not None and list(scaler_names) != feature_order:
+        raise ValueError(f"Scaler was fitted on {list(scaler_names)}, expected {feature_order}.")
+    n_features = getattr(predictor.model, "n_features_in_", len(feature_order))
+    if n_features != len(feature_order):
+        raise ValueError(f"Model expects {n_features} features, expected {len(feature_order)}.")
+
+
+def dummy_batch(n_rows, param_info=PARAM_INFO, feature_order=EXPECTED_FEATURE_ORDER, seed=0):
+    """The default sample followed by random rows spread over every slider range."""
+    rng = np.random.default_rng(seed)
+    low = np.array([param_info[key]["min"] for key in feature_order])
+    high = np.array([param_info[key]["max"] for key in feature_order])
+    batch = rng.uniform(low, high, size=(n_rows, len(feature_order)))
+    batch[0] = [param_info[key]["default"] for key in feature_order]
+    return batch
+
+
+def exercise(predictor, load_seconds=0.0, n_rows=512):
+    """Check ``predictor`` and run a dummy batch through it so first-call costs are paid now.
+
+    ``n_rows`` is above ``Predictor.compiled_max_rows`` so both the compiled
+    and the sklearn code paths are exercised.
+    """
+    check_feature_order(predictor)
+    batch = dummy_batch(n_rows)
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        predictor.predict_proba(batch)
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    predictor.predict_one(dict(zip(EXPECTED_FEATURE_ORDER, batch[0])))
+    single_row_seconds = time.perf_counter() - start
+    return WarmupReport(predictor.engine, load_seconds, timings[0], timings[1], single_row_seconds, n_rows)
+
+
+def file_hashes(*paths):
+    """Identify files by a SHA-256 of their contents; missing files hash to None."""
+    version = []
+    for path in paths:
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            version.append((path, None))
+        else:
+            version.append((path, digest.hexdigest()))
+    return tuple(version)
+
+
+class ModelRegistry:
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH,
+                 engine="compiled", poll_interval=2.0, use_hash=False):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.artifact_path = artifact_path
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.use_hash = use_hash
+        self.error = None
+        self.reloads = 0
+        self._active = None
+        self._failed_version = None
+        self._load_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def active(self):
+        """The published :class:`ModelVersion`, or None before the first successful load."""
+        return self._active
+
+    def fingerprint(self):
+        paths = model_files(self.model_path, self.scaler_path, self.artifact_path)
+        return file_hashes(*paths) if self.use_hash else artifact_version(*paths)
+
+    def load(self):
+        """Load, check and exercise the model on disk, then publish it. Returns the new version."""
+        with self._load_lock:
+            version = self.fingerprint()
+            start = time.perf_counter()
+            try:
+                predictor = Predictor.load(self.model_path, self.scaler_path, self.artifact_path, engine=self.engine)
+                report = exercise(predictor, time.perf_counter() - start)
+            except Exception as e:
+                self.error = e
+                self._failed_version = version
+                raise
+            # Publishing is one reference assignment; in-flight callers keep the version they read
+            self._active = ModelVersion(version, predictor, time.time(), report)
+            self.error = None
+            self._failed_version = None
+            self.reloads += 1
+            return self._active
+
+    def load_quietly(self):
+        """:meth:`load`, keeping any failure in ``error`` instead of raising it."""
+        try:
+            return self.load()
+        except Exception:
+            return None
+
+    def ensure_loaded(self):
+        """Return the active version, loading synchronously if nothing has been tried yet."""
+        if self._active is None and self._failed_version is None:
+            # Let a warm-up that is already running finish rather than loading twice
+            with self._load_lock:
+                pass
+            if self._active is None and self._failed_version is None:
+                self.load_quietly()
+        return self._active
+
+    def needs_reload(self, version=None):
+        """True if the files on disk differ from the active version and have not already failed to load."""
+        version = self.fingerprint() if version is None else version
+        active = self._active
+        return version != self._failed_version and (active is None or version != active.version)
+
+    def load_in_background(self):
+        """Run :meth:`load_quietly` on a daemon thread unless a load is already running."""
+        if self._load_lock.locked():
+            return None
+        thread = threading.Thread(target=self.load_quietly, name="safesip-model-load", daemon=True)
+        thread.start()
+        return thread
+
+    def start_watching(self):
+        """Poll the model files and reload in the background when they change. Idempotent."""
+
+        def watch():
+            previous = None
+            while True:
+                time.sleep(self.poll_interval)
+                version = self.fingerprint()
+                # Wait for two identical readings so a file that is still being copied is not loaded
+                if version == previous and self.needs_reload(version):
+                    self.load_quietly()
+                previous = version
+
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=watch, name="safesip-model-watcher", daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH, engine="compiled"):
+    """The process-wide registry for these model files and engine."""
+    key = (model_path, scaler_path, artifact_path, engine)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = ModelRegistry(model_path, scaler_path, artifact_path, engine)
+        return registry
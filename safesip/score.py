@@ -0,0 +1,280 @@
+"""Score CSV or Parquet files of any size in fixed-size chunks.
+
+Each chunk is read, scored with the same model and scaler as the Analyze page
+and written out before the next one is read, so memory stays flat however
+large the input is. ``-`` reads stdin or writes stdout.
+
+Usage::
+
+    python -m safesip.score readings.csv -o scored.csv
+    python -m safesip.score archive.parquet -o scored.parquet --chunk-size 200000
+    zcat readings.csv.gz | python -m safesip.score - > scored.csv
+
+Rows that fail validation against ``PARAM_INFO`` are passed through unscored
+with a ``Validation_Code``, as in the page's bulk upload; ``--clip`` clips
+out-of-range values instead. ``--cascade`` screens rows with the distilled
+model from ``python -m safesip.cascade`` and runs the forest only on the
+unclear ones. ``--labels-only`` leaves out the probability column, so each
+row's walk through the forest stops as soon as its vote is settled.
+Throughput and validation statistics are printed to stderr at the end.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER
+from safesip.predictor import ARTIFACT_PATH, CASCADE_PATH, MODEL_PATH, SCALER_PATH, Predictor
+from safesip.validation import MISSING, validate
+
+FORMATS = ("csv", "parquet")
+
+
+def score_frame(predictor, frame, clip=False, probabilities=True):
+    """Return ``(results, validation)``: ``frame`` plus Prediction, Result, Potable_Probability
+    and Validation_Code columns, and the :class:`~safesip.validation.ValidationResult`.
+
+    Rows that fail validation (missing, non-numeric or out-of-range values) keep
+    empty result columns; ``Validation_Code`` says why. With ``clip=True``
+    out-of-range values are clipped to the parameter range and scored. If the
+    predictor has an imputer, rows whose only problem is missing values are
+    imputed and scored, and flagged in an ``Imputed`` column. With
+    ``probabilities=False`` the labels come from the predictor's early-exit
+    ``predict_early`` and there is no Potable_Probability column.
+    """
+    import pandas as pd
+
+    validation = validate(frame, feature_order=predictor.feature_order, clip=clip)
+    imputing = getattr(predictor, "imputer", None) is not None
+    valid_rows = validation.scorable(allow_missing=imputing)
+
+    results = frame.copy()
+    results["Prediction"] = pd.Series(pd.NA, index=frame.index, dtype="Int64")
+    results["Result"] = pd.Series(None, index=frame.index, dtype=object)
+    if probabilities:
+        results["Potable_Probability"] = np.nan
+    results["Validation_Code"] = validation.row_codes
+    if imputing:
+        results["Imputed"] = valid_rows & ((validation.row_codes & MISSING) != 0)
+    if valid_rows.any():
+        # One imputation, transform and forest pass for the whole chunk
+        if probabilities:
+            probability = predictor.predict_proba(validation.values[valid_rows])
+            prediction = predictor.classes_[probability.argmax(axis=1)]
+            results.loc[valid_rows, "Potable_Probability"] = probability[:, 1]
+        else:
+            prediction = predictor.predict_early(validation.values[valid_rows])[0]
+        results.loc[valid_rows, "Prediction"] = prediction
+        results.loc[valid_rows, "Result"] = np.where(prediction == 1, "POTABLE", "NON-POTABLE")
+    return results, validation
+
+
+def infer_format(path, default="csv"):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("parquet", "pq"):
+        return "parquet"
+    if extension in ("csv", "txt"):
+        return "csv"
+    return default
+
+
+def read_chunks(path, fmt, chunk_size):
+    """Yield DataFrames of at most ``chunk_size`` rows."""
+    if fmt == "csv":
+        import pandas as pd
+        source = sys.stdin.buffer if path == "-" else path
+        yield from pd.read_csv(source, chunksize=chunk_size)
+        return
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet needs pyarrow (pip install pyarrow).") from None
+    if path == "-":
+        raise ValueError("Parquet cannot be streamed from stdin; pass a file path.")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_schema(path, fmt):
+    """The Arrow schema of a Parquet input, or None for CSV, whose types pandas infers per chunk."""
+    if fmt != "parquet" or path == "-":
+        return None
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).schema_arrow
+
+
+def parquet_schema(columns, source_schema=None):
+    """The output schema, fixed from the column names alone so it cannot drift from chunk to chunk.
+
+    Features are written as floats (a cell that is not a number becomes null;
+    ``Validation_Code`` says why), the result columns have fixed types, and any
+    other column keeps its type from the Parquet input, or is written as text.
+    """
+    import pyarrow as pa
+
+    result_types = {
+        "Prediction": pa.int64(), "Result": pa.string(), "Potable_Probability": pa.float64(),
+        "Validation_Code": pa.uint8(), "Imputed": pa.bool_(),
+    }
+    fields = []
+    for name in columns:
+        if name in result_types:
+            field_type = result_types[name]
+        elif name in EXPECTED_FEATURE_ORDER:
+            field_type = pa.float64()
+        elif source_schema is not None and name in source_schema.names:
+            field_type = source_schema.field(name).type
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(name, field_type))
+    return pa.schema(fields)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file (or stdout) as they are produced."""
+
+    def __init__(self, path, fmt, source_schema=None):
+        self.path = path
+        self.fmt = fmt
+        self.source_schema = source_schema
+        self._file = None
+        self._parquet = None
+        self._schema = None
+
+    def write(self, frame):
+        if self.fmt == "csv":
+            if self._file is None:
+                self._file = sys.stdout if self.path == "-" else open(self.path, "w", newline="", encoding="utf-8")
+                frame.to_csv(self._file, index=False)
+            else:
+                frame.to_csv(self._file, index=False, header=False)
+            return
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet needs pyarrow (pip install pyarrow).") from None
+        import pandas as pd
+
+        if self._parquet is None:
+            self._schema = parquet_schema(frame.columns, self.source_schema)
+            sink = pa.PythonFile(sys.stdout.buffer, mode="w") if self.path == "-" else self.path
+            self._parquet = pq.ParquetWriter(sink, self._schema)
+        frame = frame.copy()
+        for field in self._schema:
+            # Types inferred per chunk drift (an all-empty chunk, a stray word in a numeric column)
+            if pa.types.is_float64(field.type) and field.name in EXPECTED_FEATURE_ORDER:
+                frame[field.name] = pd.to_numeric(frame[field.name], errors="coerce")
+            elif pa.types.is_string(field.type):
+                frame[field.name] = frame[field.name].astype("string")
+        self._parquet.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        elif self._file is sys.stdout:
+            sys.stdout.flush()
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def score_file(predictor, input_path, output_path, input_format="csv", output_format="csv", chunk_size=100_000,
+               clip=False, probabilities=True):
+    """Score ``input_path`` chunk by chunk into ``output_path``; return the run statistics."""
+    start = time.perf_counter()
+    stats = {"rows": 0, "scored": 0, "chunks": 0, "score_seconds": 0.0, "issues": {}}
+    source_schema = read_schema(input_path, input_format) if output_format == "parquet" else None
+    writer = ChunkWriter(output_path, output_format, source_schema)
+    try:
+        for chunk in read_chunks(input_path, input_format, chunk_size):
+            chunk_start = time.perf_counter()
+            results, validation = score_frame(predictor, chunk, clip, probabilities)
+            stats["score_seconds"] += time.perf_counter() - chunk_start
+            writer.write(results)
+            stats["rows"] += len(chunk)
+            stats["scored"] += int(results["Prediction"].notna().sum())
+            for feature, counts in validation.counts().items():
+                for name, n in counts.items():
+                    feature_issues = stats["issues"].setdefault(feature, {})
+                    feature_issues[name] = feature_issues.get(name, 0) + n
+            stats["chunks"] += 1
+    finally:
+        writer.close()
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["peak_memory_mb"] = peak_memory_mb()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of water samples in fixed-size chunks.")
+    parser.add_argument("input", help="CSV or Parquet file, or - for CSV on stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout (default)")
+    parser.add_argument("--input-format", choices=FORMATS, help="default: from the input file extension, else csv")
+    parser.add_argument("--output-format", choices=FORMATS, help="default: from the output file extension, else csv")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows read, scored and written at a time")
+    parser.add_argument("--clip", action="store_true", help="clip out-of-range values to the parameter range instead of skipping the row")
+    parser.add_argument("--workers", type=int, default=1, help="score chunks on this many processes; 0 for one per core")
+    parser.add_argument("--labels-only", action="store_true",
+                        help="write labels without probabilities, stopping each row's walk through the forest once its vote is settled")
+    parser.add_argument("--cascade", nargs="?", const=CASCADE_PATH, default=None,
+                        help="screen rows with the distilled model (default file: %(const)s) and fall back to the forest when unsure")
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="flat-array artifact directory, preferred when present")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or infer_format(args.input)
+    output_format = args.output_format or infer_format(args.output)
+    if args.cascade and args.workers != 1:
+        parser.error("--cascade scores in one process; drop --workers.")
+    if args.workers == 1:
+        predictor = Predictor.load(args.model, args.scaler, args.artifact)
+        if args.cascade:
+            from safesip.cascade import CascadePredictor, load_student
+            student = load_student(args.cascade)
+            if student is None:
+                parser.error(f"No cascade student at {args.cascade}; fit one with python -m safesip.cascade.")
+            predictor = CascadePredictor(predictor, student)
+    else:
+        from safesip.parallel import ParallelScorer
+        predictor = ParallelScorer(args.workers or None, args.model, args.scaler, args.artifact)
+    if list(predictor.feature_order) != EXPECTED_FEATURE_ORDER:
+        parser.error(f"Model feature order {predictor.feature_order} does not match {EXPECTED_FEATURE_ORDER}.")
+
+    try:
+        stats = score_file(predictor, args.input, args.output, input_format, output_format, args.chunk_size, args.clip,
+                           probabilities=not args.labels_only)
+    finally:
+        if args.workers != 1:
+            predictor.close()
+    memory = "" if stats["peak_memory_mb"] is None else f", peak memory {stats['peak_memory_mb']:.0f} MB"
+    print(
+        f"Scored {stats['scored']} of {stats['rows']} rows in {stats['chunks']} chunks, {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:,.0f} rows/s; validation and model {stats['score_seconds']:.2f}s){memory}",
+        file=sys.stderr,
+    )
+    if args.cascade:
+        cascade = predictor.stats()
+        print(f"  cascade: {cascade['fallbacks']} of {cascade['rows']} rows fell back to the forest "
+              f"({cascade['fallback_rate']:.1%})", file=sys.stderr)
+    for feature, counts in stats["issues"].items():
+        print(f"  {feature}: {', '.join(f'{n} {name}' for name, n in counts.items())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
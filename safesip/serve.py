@@ -0,0 +1,32 @@
+"""Warm the model up, then start the Streamlit app in the same process.
+
+Usage::
+
+    python -m safesip.serve [streamlit options, e.g. --server.port 8501]
+"""
+import sys
+
+from safesip.warmup import warm_up
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        report = warm_up()
+    except Exception as e:
+        # Keep serving; the Analyze page reports loading problems to the user
+        print(f"SafeSip warm-up failed: {e}", file=sys.stderr)
+    else:
+        print(
+            f"SafeSip warm-up finished in {report.total_seconds:.2f}s "
+            f"(load {report.load_seconds:.2f}s, first batch of {report.n_rows} {report.first_batch_seconds * 1000:.1f} ms, "
+            f"steady batch {report.steady_batch_seconds * 1000:.1f} ms, single row {report.single_row_seconds * 1000:.2f} ms)"
+        )
+
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", "app.py", *argv]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Local HTTP scoring service for systems that cannot drive the Streamlit UI.
+
+Serves the same model as the Analyze page, from the same process-wide
+registry, so it hot-reloads when the model files change. Standard library
+only; it binds to localhost unless told otherwise.
+
+Usage::
+
+    python -m safesip.service --port 8600
+
+Endpoints:
+
+``GET /health``
+    200 with the active model version, or 503 if no model could be loaded.
+``GET /metrics``
+    Request, row and latency counters, plus the micro-batching statistics.
+``POST /predict``
+    One JSON object with every feature in ``EXPECTED_FEATURE_ORDER``.
+``POST /predict/bulk``
+    NDJSON, one sample per line. Results are streamed back as NDJSON in input
+    order, one line per non-empty input line, as each chunk is scored. Invalid
+    lines get an ``error`` entry instead of a prediction.
+
+Samples are checked with :func:`safesip.validation.validate`, the same rules
+as the bulk upload and ``safesip.score``. Rejected samples carry its messages
+and a ``validation_code``; fields outside ``EXPECTED_FEATURE_ORDER`` are
+ignored, and missing values are imputed when the model has an imputer.
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from safesip.batching import BatchingPredictor
+from safesip.features import EXPECTED_FEATURE_ORDER, PARAM_INFO
+from safesip.predictor import ARTIFACT_PATH, MODEL_PATH, SCALER_PATH
+from safesip.registry import get_registry
+from safesip.validation import validate
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BULK_BYTES = 256 << 20
+
+
+class ValidationError(ValueError):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def _cell(value):
+    """A parsed JSON value as :func:`~safesip.validation.validate` should see it.
+
+    Numbers become floats (integers too large for a float become inf), strings
+    are parsed like CSV cells and null is missing. Anything else, booleans
+    included, is kept as a string that cannot be read as a number.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "not a number"
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf
+
+
+def validate_samples(samples, feature_order=EXPECTED_FEATURE_ORDER, param_info=PARAM_INFO):
+    """Validate parsed JSON objects as columns, with the same checks as the bulk upload and the CLI."""
+    columns = {key: [_cell(sample.get(key)) for sample in samples] for key in feature_order}
+    return validate(columns, param_info, feature_order)
+
+
+def rejection(validation, row):
+    """The error message and code for a row that cannot be scored."""
+    return "; ".join(validation.messages(row)), int(validation.row_codes[row])
+
+
+def prediction_record(label, probabilities, classes):
+    record = {"label": label, "probabilities": dict(zip(classes, probabilities.tolist()))}
+    if 1 in classes:
+        record["potable_probability"] = float(probabilities[classes.index(1)])
+    return record
+
+
+class ScoringService:
+    """Model access and counters shared by every request handler thread."""
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH, artifact_path=ARTIFACT_PATH,
+                 engine="compiled", chunk_size=1024):
+        self.registry = get_registry(model_path, scaler_path, artifact_path, engine)
+        self.chunk_size = chunk_size
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._batcher = None
+        self._counters = {"requests": 0, "rows_scored": 0, "rows_rejected": 0, "errors": 0}
+        self._seconds = {}
+
+    def active_model(self):
+        return self.registry.ensure_loaded()
+
+    def batcher(self, active):
+        """The micro-batching front end for ``active``, replaced when the registry swaps models."""
+        with self._lock:
+            if self._batcher is None or self._batcher.predictor is not active.predictor:
+                self._batcher = BatchingPredictor(active.predictor)
+            return self._batcher
+
+    def count(self, endpoint, seconds, rows_scored=0, rows_rejected=0, error=False):
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["rows_scored"] += rows_scored
+            self._counters["rows_rejected"] += rows_rejected
+            self._counters["errors"] += int(error)
+            n, total, worst = self._seconds.get(endpoint, (0, 0.0, 0.0))
+            self._seconds[endpoint] = (n + 1, total + seconds, max(worst, seconds))
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics["uptime_seconds"] = time.time() - self.started_at
+            metrics["latency_ms"] = {
+                endpoint: {"count": n, "mean": 1000 * total / n, "max": 1000 * worst}
+                for endpoint, (n, total, worst) in self._seconds.items()
+            }
+            batcher = self._batcher
+        metrics["model_reloads"] = self.registry.reloads
+        metrics["batching"] = batcher.stats() if batcher is not None else None
+        return metrics
+
+    def predict(self, sample):
+        if not isinstance(sample, dict):
+            raise ValidationError("Expected a JSON object mapping feature names to values.")
+        active = self.active_model()
+        validation = validate_samples([sample], active.predictor.feature_order)
+        if not validation.scorable(allow_missing=active.predictor.imputer is not None)[0]:
+            raise ValidationError(*rejection(validation, 0))
+        prediction = self.batcher(active).predict_one(dict(zip(validation.feature_order, validation.values[0].tolist())))
+        classes = active.predictor.classes_.tolist()
+        record = prediction_record(prediction.label, prediction.probabilities, classes)
+        record["margin"] = dict(zip(classes, prediction.margin.tolist()))
+        record["tree_votes"] = dict(zip(classes, prediction.tree_votes.tolist()))
+        return record
+
+    def score_lines(self, lines, first_row, predictor):
+        """Return one NDJSON-ready record per line and the number scored.
+
+        The parsed samples are validated as columns in one pass and the valid
+        ones scored in a single batch.
+        """
+        records = [None] * len(lines)
+        samples = []
+        positions = []
+        for i, line in enumerate(lines):
+            try:
+                sample = json.loads(line)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError
+                records[i] = {"row": first_row + i, "error": str(e)}
+                continue
+            if isinstance(sample, dict):
+                samples.append(sample)
+                positions.append(i)
+            else:
+                records[i] = {"row": first_row + i, "error": "Expected a JSON object mapping feature names to values."}
+        if not samples:
+            return records, 0
+
+        validation = validate_samples(samples, predictor.feature_order)
+        scorable = validation.scorable(allow_missing=getattr(predictor, "imputer", None) is not None)
+        for j in np.flatnonzero(~scorable).tolist():
+            error, code = rejection(validation, j)
+            records[positions[j]] = {"row": first_row + positions[j], "error": error, "validation_code": code}
+        scored = np.flatnonzero(scorable)
+        if scored.size:
+            probability = predictor.predict_proba(validation.values[scored])
+            labels = predictor.classes_[probability.argmax(axis=1)].tolist()
+            classes = predictor.classes_.tolist()
+            for j, label, row_probability in zip(scored.tolist(), labels, probability):
+                record = {"row": first_row + positions[j]}
+                record.update(prediction_record(label, row_probability, classes))
+                records[positions[j]] = record
+        return records, int(scored.size)
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SafeSip"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        start = time.perf_counter()
+        if self.path == "/health":
+            active = service.active_model()
+            if active is None:
+                self.send_json(503, {"status": "unavailable", "error": str(service.registry.error)})
+            else:
+                self.send_json(200, {
+                    "status": "ok",
+                    "engine": active.predictor.engine,
+                    "model_version": [list(entry) for entry in active.version],
+                    "loaded_at": active.loaded_at,
+                })
+        elif self.path == "/metrics":
+            self.send_json(200, service.metrics())
+        else:
+            self.send_json(404, {"error": f"Unknown path '{self.path}'."})
+            return
+        service.count(self.path, time.perf_counter() - start)
+
+    def do_POST(self):
+        if self.path == "/predict":
+            self.handle_predict()
+        elif self.path == "/predict/bulk":
+            self.handle_bulk()
+        else:
+            self.send_json(404, {"error": f"Unknown path '{self.path}'."})
+
+    def content_length(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.send_json(411, {"error": "A Content-Length header is required."})
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused either
+            self.close_connection = True
+            self.send_json(400, {"error": "Content-Length must be a non-negative integer."})
+            return None
+        return length
+
+    def handle_predict(self):
+        service = self.server.service
+        start = time.perf_counter()
+        length = self.content_length()
+        if length is None:
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": f"Body exceeds {MAX_BODY_BYTES} bytes; use /predict/bulk."})
+            return
+        try:
+            if service.active_model() is None:
+                self.send_json(503, {"error": f"No model is loaded: {service.registry.error}"})
+                service.count(self.path, time.perf_counter() - start, error=True)
+                return
+            record = service.predict(json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            payload = {"error": str(e)}
+            if getattr(e, "code", None) is not None:
+                payload["validation_code"] = e.code
+            self.send_json(400, payload)
+            service.count(self.path, time.perf_counter() - start, rows_rejected=1)
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"Prediction failed: {e}"})
+            service.count(self.path, time.perf_counter() - start, error=True)
+            return
+        self.send_json(200, record)
+        service.count(self.path, time.perf_counter() - start, rows_scored=1)
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def handle_bulk(self):
+        service = self.server.service
+        start = time.perf_counter()
+        length = self.content_length()
+        if length is None:
+            return
+        if length > MAX_BULK_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": f"Body exceeds {MAX_BULK_BYTES} bytes; score larger files with the CLI."})
+            return
+        # Read the whole body before answering: simple clients only start reading the response once
+        # they have sent everything, so interleaving would deadlock once the socket buffers fill
+        lines = [line for line in self.rfile.read(length).splitlines() if line.strip()]
+        active = service.active_model()
+        if active is None:
+            self.send_json(503, {"error": f"No model is loaded: {service.registry.error}"})
+            service.count(self.path, time.perf_counter() - start, error=True)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # Every chunk is scored by the model version that was active when the request arrived
+        predictor = active.predictor
+        scored = 0
+        failed = False
+        try:
+            for row in range(0, len(lines), service.chunk_size):
+                records, n_scored = service.score_lines(lines[row:row + service.chunk_size], row, predictor)
+                self.write_chunk("".join(json.dumps(record) + "\n" for record in records).encode())
+                scored += n_scored
+        except Exception as e:
+            # The status line is already sent; report the failure in-band and still end the stream properly
+            failed = True
+            self.write_chunk((json.dumps({"row": row, "error": f"Prediction failed: {e}"}) + "\n").encode())
+        self.write_chunk(b"")
+        service.count(self.path, time.perf_counter() - start, rows_scored=scored, rows_rejected=len(lines) - scored,
+                      error=failed)
+
+
+def make_server(host="127.0.0.1", port=8600, service=None, verbose=False):
+    server = ThreadingHTTPServer((host, port), ScoringHandler)
+    server.daemon_threads = True
+    server.service = ScoringService() if service is None else service
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve SafeSip predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind; keep the default for local-only access")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--model", default=MODEL_PATH, help="fitted RandomForestClassifier (joblib)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="fitted StandardScaler (joblib)")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="flat-array artifact directory, preferred when present")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="bulk rows scored per forest pass")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    service = ScoringService(args.model, args.scaler, args.artifact, chunk_size=args.chunk_size)
+    active = service.active_model()
+    if active is None:
+        # Keep serving; /health reports the problem and the registry retries when the files change
+        print(f"SafeSip model failed to load: {service.registry.error}")
+    service.registry.start_watching()
+
+    server = make_server(args.host, args.port, service, args.verbose)
+    print(f"SafeSip scoring service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Batched parameter sweeps over the ``PARAM_INFO`` ranges."""
+import numpy as np
+
+from safesip.features import PARAM_INFO
+
+
+def parameter_grid(param, param_info=PARAM_INFO, max_points=400):
+    """Evenly spaced values over ``param``'s slider range, on its step grid when it fits."""
+    info = param_info[param]
+    n_steps = int(round((info["max"] - info["min"]) / info["step"]))
+    if n_steps + 1 <= max_points:
+        return info["min"] + info["step"] * np.arange(n_steps + 1)
+    return np.linspace(info["min"], info["max"], max_points)
+
+
+def potable_column(predictor):
+    return int(np.flatnonzero(predictor.classes_ == 1)[0])
+
+
+def sensitivity_curve(predictor, sample, param, param_info=PARAM_INFO, max_points=400):
+    """Potable probability across ``param``'s range with every other value held at ``sample``.
+
+    All grid points are scored in a single ``predict_proba`` call.
+    """
+    grid = parameter_grid(param, param_info, max_points)
+    X = np.repeat(predictor.to_array(sample), len(grid), axis=0)
+    X[:, predictor.feature_order.index(param)] = grid
+    return grid, predictor.predict_proba(X)[:, potable_column(predictor)]
+
+
+def decision_surface(predictor, sample, x_param, y_param, param_info=PARAM_INFO, resolution=150):
+    """Potable probability over an ``x_param`` by ``y_param`` grid, others held at ``sample``.
+
+    Returns ``(x_grid, y_grid, Z)`` with ``Z[i, j]`` scored at ``(x_grid[j], y_grid[i])``.
+    The whole grid is scored in a single ``predict_proba`` call.
+    """
+    if x_param == y_param:
+        raise ValueError("Choose two different parameters for the decision surface.")
+    x_grid = parameter_grid(x_param, param_info, resolution)
+    y_grid = parameter_grid(y_param, param_info, resolution)
+    xx, yy = np.meshgrid(x_grid, y_grid)
+    X = np.repeat(predictor.to_array(sample), xx.size, axis=0)
+    X[:, predictor.feature_order.index(x_param)] = xx.ravel()
+    X[:, predictor.feature_order.index(y_param)] = yy.ravel()
+    Z = predictor.predict_proba(X)[:, potable_column(predictor)].reshape(xx.shape)
+    return x_grid, y_grid, Z
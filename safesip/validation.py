@@ -0,0 +1,155 @@
+"""Whole-batch validation of model inputs against ``PARAM_INFO``.
+
+Every check is a column-wise NumPy operation over the full batch, so
+validating costs a small fraction of scoring it. Each cell gets a bit-flag
+code and each row the OR of its cells' codes, so one integer per row says
+everything that is wrong with it.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from safesip.features import EXPECTED_FEATURE_ORDER, PARAM_INFO
+
+# Per-cell codes; a row's code is the bitwise OR of its cells
+MISSING = 1
+NOT_NUMERIC = 2
+NOT_FINITE = 4
+BELOW_MIN = 8
+ABOVE_MAX = 16
+# Informational: the value was out of range and has been clipped to it
+CLIPPED = 32
+
+ERRORS = MISSING | NOT_NUMERIC | NOT_FINITE | BELOW_MIN | ABOVE_MAX
+CODE_NAMES = {
+    MISSING: "missing",
+    NOT_NUMERIC: "not numeric",
+    NOT_FINITE: "not finite",
+    BELOW_MIN: "below minimum",
+    ABOVE_MAX: "above maximum",
+    CLIPPED: "clipped",
+}
+
+# Share of a column's values that must be out of range before the column, rather than
+# individual readings, is reported as suspect (usually a unit mismatch, e.g. g/L for mg/L)
+SUSPECT_FRACTION = 0.5
+
+
+def describe(code):
+    """Human-readable names of the flags set in ``code``."""
+    return [name for flag, name in CODE_NAMES.items() if code & flag]
+
+
+class ValidationResult(NamedTuple):
+    # Float64 values in feature order; NaN where the input could not be read, clipped if requested
+    values: np.ndarray
+    # Per-cell codes, shape (n_rows, n_features), and their OR across each row
+    codes: np.ndarray
+    row_codes: np.ndarray
+    feature_order: list
+
+    @property
+    def valid(self):
+        """Rows that can be scored."""
+        return (self.row_codes & ERRORS) == 0
+
+    def scorable(self, allow_missing=False):
+        """Rows that can be scored, counting rows whose only problem is missing values if they will be imputed."""
+        errors = ERRORS & ~MISSING if allow_missing else ERRORS
+        return (self.row_codes & errors) == 0
+
+    def counts(self):
+        """``{feature: {code name: rows}}`` for every flag that occurs."""
+        counts = {}
+        for j, feature in enumerate(self.feature_order):
+            column = self.codes[:, j]
+            for flag, name in CODE_NAMES.items():
+                n = int(np.count_nonzero(column & flag))
+                if n:
+                    counts.setdefault(feature, {})[name] = n
+        return counts
+
+    def suspect_columns(self):
+        """Features where most readable values are out of range, which usually means wrong units."""
+        out_of_range = (self.codes & (BELOW_MIN | ABOVE_MAX | CLIPPED)) != 0
+        readable = (self.codes & (MISSING | NOT_NUMERIC | NOT_FINITE)) == 0
+        n_readable = readable.sum(axis=0)
+        fraction = out_of_range.sum(axis=0) / np.maximum(n_readable, 1)
+        return [feature for feature, f, n in zip(self.feature_order, fraction, n_readable) if n and f > SUSPECT_FRACTION]
+
+    def messages(self, row):
+        """Problems with one row, e.g. ``["ph: above maximum"]``."""
+        return [
+            f"{feature}: {', '.join(describe(code))}"
+            for feature, code in zip(self.feature_order, self.codes[row].tolist())
+            if code
+        ]
+
+
+def _numeric_column(column):
+    """Return ``(float64 values, not_numeric mask)`` for one input column."""
+    if column.dtype.kind in "biuf":
+        return column.astype(np.float64, copy=False), np.zeros(len(column), dtype=bool)
+    import pandas as pd
+    present = pd.notna(column)
+    values = pd.to_numeric(pd.Series(column), errors="coerce").to_numpy(dtype=np.float64)
+    return values, present & np.isnan(values)
+
+
+def validate(X, param_info=PARAM_INFO, feature_order=EXPECTED_FEATURE_ORDER, clip=False):
+    """Check a DataFrame, 2-D array or dict of columns against ``param_info``.
+
+    Raises ValueError for missing columns or a wrong number of features, since
+    no row of such an input can be scored. With ``clip=True``, out-of-range
+    values are clipped to ``[min, max]`` and flagged CLIPPED instead of
+    BELOW_MIN/ABOVE_MAX.
+    """
+    feature_order = list(feature_order)
+    if hasattr(X, "columns") or isinstance(X, dict):
+        missing = [key for key in feature_order if key not in X]
+        if missing:
+            raise ValueError(f"Input is missing the columns: {', '.join(missing)}")
+        columns = [np.asarray(X[key]) for key in feature_order]
+    else:
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(feature_order):
+            raise ValueError(f"Expected {len(feature_order)} features per row, got shape {X.shape}.")
+        if X.dtype.kind in "biuf":
+            columns = None
+            # Only clipping writes to the values, so otherwise the input can be used as it is
+            values = X.astype(np.float64, copy=clip)
+            not_numeric = np.zeros(values.shape, dtype=bool)
+        else:
+            columns = [X[:, j] for j in range(X.shape[1])]
+
+    if columns is not None:
+        n_rows = len(columns[0]) if columns else 0
+        # Column-major, so each column is copied in contiguously
+        values = np.empty((n_rows, len(feature_order)), dtype=np.float64, order="F")
+        not_numeric = np.zeros(values.shape, dtype=bool)
+        for j, column in enumerate(columns):
+            values[:, j], not_numeric[:, j] = _numeric_column(column)
+
+    low = np.array([param_info[key]["min"] for key in feature_order], dtype=np.float64)
+    high = np.array([param_info[key]["max"] for key in feature_order], dtype=np.float64)
+    # In-place ORs under a mask avoid a temporary array per check
+    codes = np.zeros(values.shape, dtype=np.uint8)
+    np.bitwise_or(codes, MISSING, out=codes, where=np.isnan(values))
+    np.copyto(codes, NOT_NUMERIC, where=not_numeric)
+    infinite = np.isinf(values)
+    np.bitwise_or(codes, NOT_FINITE, out=codes, where=infinite)
+    below = values < low
+    above = values > high
+    if infinite.any():
+        below &= ~infinite
+        above &= ~infinite
+    if clip:
+        np.clip(values, low, high, out=values)
+        np.bitwise_or(codes, CLIPPED, out=codes, where=below | above)
+    else:
+        np.bitwise_or(codes, BELOW_MIN, out=codes, where=below)
+        np.bitwise_or(codes, ABOVE_MAX, out=codes, where=above)
+    row_codes = np.bitwise_or.reduce(codes, axis=1) if codes.shape[1] else np.zeros(len(codes), dtype=np.uint8)
+    return ValidationResult(values, codes, row_codes, feature_order)
@@ -0,0 +1,31 @@
+"""Load and exercise the model before the first session needs it.
+
+``python -m safesip.serve`` calls :func:`warm_up` in the server process before
+Streamlit starts; ``app.py`` also starts :func:`start_background_warm_up` on
+its first run for servers launched with plain ``streamlit run``. Both publish
+into the process-wide :class:`~safesip.registry.ModelRegistry`, which the
+Analyze page reads from and which keeps the model current afterwards.
+"""
+from safesip.predictor import ARTIFACT_PATH, MODEL_PATH, SCALER_PATH
+from safesip.registry import get_registry
+
+
+def warm_up(model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine="compiled"):
+    """Load the predictor, check its feature order and run a dummy batch through it.
+
+    The shared flat-array artifact at ``ARTIFACT_PATH`` is used when present.
+    """
+    return get_registry(model_path, scaler_path, ARTIFACT_PATH, engine).load().report
+
+
+def start_background_warm_up(model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine="compiled"):
+    """Warm up on a daemon thread and keep watching the model files for changes.
+
+    Returns None without starting a load if a current warmed predictor already exists.
+    """
+    registry = get_registry(model_path, scaler_path, ARTIFACT_PATH, engine)
+    registry.start_watching()
+    if not registry.needs_reload():
+        return None
+    return registry.load_in_background()
+
@@ -0,0 +1,5 @@
+from safesip.importtime import BUDGETS_MS, report
+
+
+def test_entry_points_start_within_budget():
+    assert report(list(BUDGETS_MS)) == []